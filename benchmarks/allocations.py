@@ -0,0 +1,121 @@
+"""Per-frame allocation check
+
+Renders frames through ``FrameGenerator`` with a frame pool into
+``VideoWriter``, the way ``muviz`` does, and watches the Python and NumPy
+heap with tracemalloc. Once the pool is warm the heap may not grow by a
+frame's worth while a frame is rendered and encoded, as it would if the
+frame were copied on its way from visualizer to encoder. Exits with
+status 1 otherwise, so it can gate CI.
+
+All stages run in one thread (no prefetch queues), so the peak heap
+between two frames covers exactly rendering one frame and encoding the
+one before. The moviepy backend is not checked: moviepy copies every
+frame with ``tobytes`` before writing it to ffmpeg.
+
+Usage:
+    python -m benchmarks.allocations
+    python -m benchmarks.allocations --frames 120 --style particle --backend cv2
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+from typing import Iterable, Iterator, List
+
+import click
+
+from benchmarks.run import SAMPLE_RATE, STYLES, make_analyzer, make_visualizer
+from benchmarks.signals import SIGNALS
+
+BACKENDS = ["ffmpeg", "cv2"]
+
+
+def watch_frames(frames: Iterable, warmup: int, frame_bytes: int, hits: List[int]) -> Iterator:
+    """Pass frames on, recording the ones that needed a frame-sized allocation
+
+    Args:
+        frames: Frames, rendered lazily
+        warmup: Frames allowed to allocate while the pool fills up
+        frame_bytes: Size of one frame
+        hits: Receives the index of every offending frame
+    """
+    baseline = 0
+    for index, frame in enumerate(frames):
+        # The peak since the previous frame covers encoding that frame
+        # and rendering this one
+        _, peak = tracemalloc.get_traced_memory()
+        if index > warmup and peak - baseline >= frame_bytes:
+            hits.append(index)
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        yield frame
+
+
+def count_allocations(style: str, backend: str, frames: int, warmup: int,
+                      width: int, height: int, signal: str) -> List[int]:
+    """Render and encode frames, returning those that allocated a frame"""
+    from muviz.config.settings import VisualizerConfig
+    from muviz.renderer.frame_generator import FrameGenerator
+    from muviz.renderer.video_writer import VideoWriter
+    from muviz.visualizer.base import FRAME_CHANNELS
+
+    fps = 30
+    config = VisualizerConfig(
+        width=width, height=height, fps=fps, style=style, backend=backend,
+        feature_queue_chunks=0, encode_queue_frames=0,
+    )
+    analyzer = make_analyzer(signal, frames / fps)
+    config.sample_rate = SAMPLE_RATE
+    writer = VideoWriter(config)
+    generator = FrameGenerator(
+        analyzer, make_visualizer(style, config), config,
+        pool_frames=writer.frames_in_flight() + 1,
+    )
+    writer.frame_pool = generator.frame_pool
+
+    hits = []
+    frame_bytes = width * height * FRAME_CHANNELS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "allocations.mp4")
+        tracemalloc.start()
+        try:
+            writer.write_video(
+                watch_frames(generator.iter_frames(), warmup, frame_bytes, hits), None, output
+            )
+        finally:
+            tracemalloc.stop()
+    return hits
+
+
+@click.command()
+# More than the longest visualizer history (abstract keeps 100 waveforms)
+@click.option("--frames", type=click.IntRange(min=1), default=120, help="Frames per case")
+@click.option("--warmup", type=click.IntRange(min=0), default=10,
+              help="Leading frames allowed to allocate")
+@click.option("--style", "styles", multiple=True, type=click.Choice(STYLES),
+              help="Visualizer styles to check (default: all)")
+@click.option("--backend", "backends", multiple=True, type=click.Choice(BACKENDS),
+              help="Writer backends to check (default: all)")
+@click.option("--width", type=int, default=1280, help="Frame width")
+@click.option("--height", type=int, default=720, help="Frame height")
+@click.option("--signal", type=click.Choice(sorted(SIGNALS)), default="mix", help="Input signal")
+def main(frames, warmup, styles, backends, width, height, signal):
+    """Check that frames are rendered and encoded without frame allocations"""
+    failures = []
+    for style in styles or STYLES:
+        for backend in backends or BACKENDS:
+            hits = count_allocations(style, backend, frames, warmup, width, height, signal)
+            checked = max(0, frames - warmup - 1)
+            click.echo(f"{style}/{backend}: {len(hits)} of {checked} frames allocated a frame")
+            if hits:
+                failures.append(f"{style}/{backend} allocated frames at {hits[:10]}")
+
+    for failure in failures:
+        click.echo(f"FAIL: {failure}", err=True)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Benchmark suite for muviz
+
+Runs audio analysis, every visualizer and every video writer backend on
+synthetic signals and reports frames/sec, ms/frame percentiles and peak
+memory. Every case runs in a fresh process so its peak RSS is its own.
+
+Usage:
+    python -m benchmarks.run --save results.json
+    python -m benchmarks.run --quick --baseline results.json
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from queue import Empty
+from typing import Callable, Dict, List
+
+import click
+import numpy as np
+
+from benchmarks.signals import SIGNALS
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+STYLES = ["geometric", "particle", "abstract"]
+
+BACKENDS = ["ffmpeg", "moviepy", "cv2"]
+
+SAMPLE_RATE = 22050
+
+# Seconds between checks whether a case process is still running
+POLL_SECONDS = 1.0
+
+
+def summarize(durations: List[float], frames: int) -> dict:
+    """Turn per-frame durations into throughput and latency percentiles
+
+    Args:
+        durations: Seconds spent per frame (or per run)
+        frames: Frames processed in total
+
+    Returns:
+        Dictionary of metrics
+    """
+    ms = np.array(durations) * 1000
+    total = float(np.sum(durations))
+    return {
+        "frames": frames,
+        "seconds": total,
+        "frames_per_sec": frames / total if total > 0 else 0.0,
+        "ms_p50": float(np.percentile(ms, 50)),
+        "ms_p90": float(np.percentile(ms, 90)),
+        "ms_p99": float(np.percentile(ms, 99)),
+    }
+
+
+def make_analyzer(signal: str, seconds: float):
+    """Build an analyzer holding a synthetic signal"""
+    from muviz.audio.analyzer import AudioAnalyzer
+
+    analyzer = AudioAnalyzer(sample_rate=SAMPLE_RATE)
+    analyzer.load_array(SIGNALS[signal](seconds, SAMPLE_RATE))
+    return analyzer
+
+
+def make_visualizer(style: str, config):
+    """Instantiate a visualizer by style name"""
+    from muviz.visualizer.abstract import AbstractVisualizer
+    from muviz.visualizer.geometric import GeometricVisualizer
+    from muviz.visualizer.particle import ParticleVisualizer
+
+    classes = {
+        "geometric": GeometricVisualizer,
+        "particle": ParticleVisualizer,
+        "abstract": AbstractVisualizer,
+    }
+    return classes[style](config)
+
+
+def bench_analyzer(signal: str, seconds: float, fps: int, repeat: int = 5) -> dict:
+    """Time AudioAnalyzer.compute_features on a synthetic signal"""
+    analyzer = make_analyzer(signal, seconds)
+    durations = []
+    frames = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames += len(analyzer.compute_features(fps))
+        durations.append(time.perf_counter() - start)
+    return summarize(durations, frames)
+
+
+def bench_render(style: str, resolution: str, fps: int, seconds: float, signal: str) -> dict:
+    """Time render_frame for every frame of a synthetic signal"""
+    from muviz.config.settings import VisualizerConfig
+
+    width, height = RESOLUTIONS[resolution]
+    config = VisualizerConfig(width=width, height=height, fps=fps, style=style)
+    features = make_analyzer(signal, seconds).compute_features(fps)
+    visualizer = make_visualizer(style, config)
+
+    durations = []
+    for frame_idx in range(len(features)):
+        audio_data = features.frame(frame_idx)
+        start = time.perf_counter()
+        visualizer.render_frame(audio_data)
+        durations.append(time.perf_counter() - start)
+    return summarize(durations, len(durations))
+
+
+def bench_writer(backend: str, resolution: str, fps: int, seconds: float, signal: str) -> dict:
+    """Time a VideoWriter backend encoding pre-rendered frames
+
+    A short loop of geometric frames is rendered up front and cycled, so
+    the measurement is dominated by conversion and encoding.
+    """
+    from muviz.config.settings import VisualizerConfig
+    from muviz.renderer.video_writer import VideoWriter
+
+    width, height = RESOLUTIONS[resolution]
+    config = VisualizerConfig(width=width, height=height, fps=fps, backend=backend)
+    analyzer = make_analyzer(signal, seconds)
+    features = analyzer.compute_features(fps)
+    visualizer = make_visualizer("geometric", config)
+    loop = [visualizer.render_frame(features.frame(i)) for i in range(min(fps, len(features)))]
+
+    durations = []
+
+    def frames():
+        last = time.perf_counter()
+        for frame in itertools.islice(itertools.cycle(loop), len(features)):
+            yield frame
+            now = time.perf_counter()
+            durations.append(now - last)
+            last = now
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "bench.mp4")
+        start = time.perf_counter()
+        VideoWriter(config).write_video(frames(), analyzer.audio, output)
+        total = time.perf_counter() - start
+
+    metrics = summarize(durations, len(durations))
+    # Include encoder flush and muxing after the last frame
+    metrics["seconds"] = total
+    metrics["frames_per_sec"] = len(durations) / total
+    return metrics
+
+
+def _run_case(func: Callable, kwargs: dict, queue) -> None:
+    """Run one case in a worker process and report metrics plus peak RSS"""
+    from muviz.profiling import peak_rss_mb
+
+    try:
+        metrics = func(**kwargs)
+        metrics["peak_rss_mb"] = peak_rss_mb()
+        queue.put(metrics)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(func: Callable, **kwargs) -> dict:
+    """Run a benchmark case in a fresh process
+
+    Args:
+        func: Benchmark function
+        kwargs: Arguments for func
+
+    Returns:
+        Metrics dictionary, or one with an 'error' key on failure
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_case, args=(func, kwargs, queue))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=POLL_SECONDS)
+        except Empty:
+            if process.is_alive():
+                continue
+            # Killed (e.g. out of memory) or exited without reporting; a
+            # result put just before exiting may still be in the pipe
+            try:
+                result = queue.get(timeout=POLL_SECONDS)
+            except Empty:
+                result = {"error": f"exit code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Compare frames/sec against a baseline
+
+    Args:
+        results: Current results by case name
+        baseline: Baseline results by case name
+        threshold: Allowed relative slowdown, e.g. 0.1 for 10%
+
+    Returns:
+        Names of cases slower than the baseline by more than threshold
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base or "frames_per_sec" not in base or "frames_per_sec" not in metrics:
+            continue
+        ratio = metrics["frames_per_sec"] / base["frames_per_sec"]
+        flag = ""
+        if ratio < 1 - threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        click.echo(f"{name:<40}{base['frames_per_sec']:>10.1f}{metrics['frames_per_sec']:>10.1f}"
+                   f"{ratio:>8.2f}x{flag}")
+    return regressions
+
+
+def environment() -> dict:
+    """Describe the machine and library versions"""
+    import muviz
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "muviz": muviz.__version__,
+    }
+
+
+@click.command()
+@click.option("--seconds", type=float, default=4.0, help="Length of each synthetic signal")
+@click.option("--signal", type=click.Choice(sorted(SIGNALS)), default="mix",
+              help="Signal used for render and writer cases")
+@click.option("--style", "styles", multiple=True, type=click.Choice(STYLES),
+              help="Visualizer styles to run (default: all)")
+@click.option("--resolution", "resolutions", multiple=True, type=click.Choice(sorted(RESOLUTIONS)),
+              help="Resolutions to run (default: all)")
+@click.option("--fps", "fps_values", multiple=True, type=int, help="Frame rates to run (default: 30 and 60)")
+@click.option("--backend", "backends", multiple=True, type=click.Choice(BACKENDS),
+              help="Writer backends to run (default: all)")
+@click.option("--quick", is_flag=True, default=False, help="Only 720p at 30 fps")
+@click.option("--save", type=click.Path(dir_okay=False), default=None,
+              help="Write results as JSON (usable as a baseline)")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Compare against a previously saved results file")
+@click.option("--threshold", type=float, default=0.1,
+              help="Relative frames/sec drop reported as a regression")
+def main(seconds, signal, styles, resolutions, fps_values, backends, quick,
+         save, baseline, threshold):
+    """Benchmark analysis, rendering and encoding"""
+    styles = styles or STYLES
+    resolutions = resolutions or (["720p"] if quick else list(RESOLUTIONS))
+    fps_values = fps_values or ([30] if quick else [30, 60])
+    backends = backends or BACKENDS
+
+    cases = []
+    for name in SIGNALS:
+        for fps in fps_values:
+            cases.append((f"analyze/{name}/{fps}fps", bench_analyzer,
+                          dict(signal=name, seconds=seconds, fps=fps)))
+    for style, resolution, fps in itertools.product(styles, resolutions, fps_values):
+        cases.append((f"render/{style}/{resolution}/{fps}fps", bench_render,
+                      dict(style=style, resolution=resolution, fps=fps,
+                           seconds=seconds, signal=signal)))
+    for backend, resolution, fps in itertools.product(backends, resolutions, fps_values):
+        cases.append((f"write/{backend}/{resolution}/{fps}fps", bench_writer,
+                      dict(backend=backend, resolution=resolution, fps=fps,
+                           seconds=seconds, signal=signal)))
+
+    click.echo(f"{'case':<40}{'fps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'RSS MB':>10}")
+    results = {}
+    for name, func, kwargs in cases:
+        metrics = run_isolated(func, **kwargs)
+        results[name] = metrics
+        if "error" in metrics:
+            click.echo(f"{name:<40}  {metrics['error']}")
+            continue
+        rss = metrics["peak_rss_mb"]
+        click.echo(
+            f"{name:<40}{metrics['frames_per_sec']:>10.1f}{metrics['ms_p50']:>10.2f}"
+            f"{metrics['ms_p90']:>10.2f}{metrics['ms_p99']:>10.2f}"
+            f"{rss if rss is not None else float('nan'):>10.1f}"
+        )
+
+    if save:
+        with open(save, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            base = json.load(f)["results"]
+        click.echo(f"\n{'case':<40}{'base fps':>10}{'new fps':>10}{'ratio':>9}")
+        regressions = compare(results, base, threshold)
+        if regressions:
+            click.echo(f"{len(regressions)} regression(s) beyond {threshold:.0%}", err=True)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
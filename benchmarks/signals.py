@@ -0,0 +1,93 @@
+"""Synthetic audio fixtures for benchmarks"""
+
+import numpy as np
+
+
+def sine_sweep(duration: float, sample_rate: int = 22050,
+               f_start: float = 40.0, f_end: float = 10000.0) -> np.ndarray:
+    """Exponential sine sweep
+
+    Args:
+        duration: Length in seconds
+        sample_rate: Sample rate
+        f_start: Start frequency in Hz
+        f_end: End frequency in Hz
+
+    Returns:
+        Mono float32 signal
+    """
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    rate = np.log(f_end / f_start) / duration
+    phase = 2 * np.pi * f_start * (np.exp(rate * t) - 1) / rate
+    return (0.5 * np.sin(phase)).astype(np.float32)
+
+
+def noise_bursts(duration: float, sample_rate: int = 22050,
+                 burst: float = 0.25, gap: float = 0.25, seed: int = 0) -> np.ndarray:
+    """White noise switched on and off
+
+    Args:
+        duration: Length in seconds
+        sample_rate: Sample rate
+        burst: Burst length in seconds
+        gap: Silence between bursts in seconds
+        seed: Random seed
+
+    Returns:
+        Mono float32 signal
+    """
+    n = int(duration * sample_rate)
+    rng = np.random.default_rng(seed)
+    noise = rng.uniform(-0.5, 0.5, n)
+    period = int((burst + gap) * sample_rate)
+    gate = (np.arange(n) % period) < int(burst * sample_rate)
+    return (noise * gate).astype(np.float32)
+
+
+def click_track(duration: float, sample_rate: int = 22050,
+                bpm: float = 120.0, click: float = 0.01) -> np.ndarray:
+    """Decaying clicks on every beat
+
+    Args:
+        duration: Length in seconds
+        sample_rate: Sample rate
+        bpm: Beats per minute
+        click: Click length in seconds
+
+    Returns:
+        Mono float32 signal
+    """
+    n = int(duration * sample_rate)
+    signal = np.zeros(n, dtype=np.float32)
+    length = int(click * sample_rate)
+    shape = np.exp(-np.linspace(0, 8, length)) * np.sin(2 * np.pi * 1000 * np.arange(length) / sample_rate)
+    for start in range(0, n, int(60 / bpm * sample_rate)):
+        end = min(start + length, n)
+        signal[start:end] = shape[:end - start]
+    return signal
+
+
+def mix(duration: float, sample_rate: int = 22050) -> np.ndarray:
+    """Sum of sweep, noise bursts and clicks, exercising every feature
+
+    Args:
+        duration: Length in seconds
+        sample_rate: Sample rate
+
+    Returns:
+        Mono float32 signal
+    """
+    signal = (
+        sine_sweep(duration, sample_rate)
+        + 0.5 * noise_bursts(duration, sample_rate)
+        + click_track(duration, sample_rate)
+    )
+    return np.clip(signal, -1.0, 1.0).astype(np.float32)
+
+
+SIGNALS = {
+    "sweep": sine_sweep,
+    "noise": noise_bursts,
+    "clicks": click_track,
+    "mix": mix,
+}
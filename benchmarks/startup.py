@@ -0,0 +1,76 @@
+"""CLI startup time budget check
+
+Measures how long ``muviz --help`` takes on top of a bare interpreter
+start, and checks that neither the CLI nor the render path imports heavy
+optional dependencies before a code path needs them. Exits with status 1
+when over budget, so it can gate CI.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget 150 --runs 20
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+import click
+
+# Modules only the selected decode/encode path may import
+HEAVY_MODULES = ["librosa", "numba", "moviepy", "cv2", "scipy"]
+
+
+def time_command(args: List[str], runs: int) -> float:
+    """Get the median wall time of a command in milliseconds"""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, stdout=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - start)
+    return 1000 * statistics.median(durations)
+
+
+def heavy_imports(module: str) -> List[str]:
+    """Get the heavy modules imported as a side effect of importing module"""
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    return result.stdout.split()
+
+
+@click.command()
+@click.option("--budget", type=float, default=150.0,
+              help="Allowed milliseconds of `muviz --help` beyond a bare interpreter")
+@click.option("--runs", type=click.IntRange(min=1), default=10, help="Runs per measurement")
+def main(budget, runs):
+    """Check CLI startup time and import hygiene"""
+    failures = []
+
+    bare = time_command([sys.executable, "-c", "pass"], runs)
+    help_ms = time_command([sys.executable, "-m", "muviz.cli", "--help"], runs)
+    overhead = help_ms - bare
+    click.echo(f"python -c pass:          {bare:8.1f} ms")
+    click.echo(f"muviz --help:            {help_ms:8.1f} ms ({overhead:+.1f} ms, budget {budget:.0f} ms)")
+    if overhead > budget:
+        failures.append(f"muviz --help is {overhead:.1f} ms over a bare interpreter")
+
+    for module in ("muviz.cli", "muviz.renderer.job"):
+        heavy = heavy_imports(module)
+        click.echo(f"import {module}: {', '.join(heavy) or 'no heavy modules'}")
+        if heavy:
+            failures.append(f"import {module} pulls in {', '.join(heavy)}")
+
+    for failure in failures:
+        click.echo(f"FAIL: {failure}", err=True)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
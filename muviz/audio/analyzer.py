@@ -1,34 +1,290 @@
 """Audio analysis module"""
 
+import itertools
 import numpy as np
-import librosa
-from typing import Tuple, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Iterator, Tuple, Optional
+
+from muviz.audio.cache import FeatureCache, hash_file
+from muviz.audio.features import FrameFeatures
+from muviz.profiling import profiler
+
+# Frames processed per batched FFT in compute_features, bounds temporary memory
+FEATURE_BATCH_FRAMES = 1024
+
+# Seconds of audio decoded per block when streaming
+STREAM_BLOCK_SECONDS = 10.0
 
 
 class AudioAnalyzer:
     """Analyzes audio files and extracts features for visualization"""
 
-    def __init__(self, sample_rate: int = 22050, hop_length: int = 512, n_fft: int = 2048):
+    def __init__(
+        self,
+        sample_rate: int = 22050,
+        hop_length: int = 512,
+        n_fft: int = 2048,
+        cache: Optional[FeatureCache] = None
+    ):
         self.sample_rate = sample_rate
         self.hop_length = hop_length
         self.n_fft = n_fft
+        self.cache = cache
         self.audio = None
         self.duration = 0
-
-    def load_audio(self, file_path: str, duration: Optional[float] = None) -> None:
+        self.offset = 0.0
+        self.stream_path = None
+        self._stream_duration = None
+        self._audio_key = None
+
+    def load_audio(
+        self,
+        file_path: str,
+        duration: Optional[float] = None,
+        offset: float = 0.0
+    ) -> None:
         """Load audio file
 
+        With a cache, the decoded audio is stored keyed by the file
+        contents, sample rate, offset and duration, and reused on later
+        loads.
+
         Args:
             file_path: Path to audio file
             duration: Optional duration limit in seconds
+            offset: Seconds into the file to start decoding at; the decoder
+                seeks there instead of decoding from the beginning
         """
-        self.audio, sr = librosa.load(
-            file_path,
-            sr=self.sample_rate,
-            duration=duration
-        )
+        self._audio_key = None
+        self.stream_path = None
+        self.offset = offset
+        if self.cache is not None:
+            with profiler.span("cache.load"):
+                parts = ("audio", hash_file(file_path), self.sample_rate, duration)
+                if offset:
+                    parts += (offset,)
+                self._audio_key = self.cache.make_key(*parts)
+                cached = self.cache.load(self._audio_key)
+            if cached is not None and "audio" in cached:
+                profiler.count("cache.hits")
+                self.audio = cached["audio"]
+                self.duration = len(self.audio) / self.sample_rate
+                return
+
+        # librosa (and numba behind it) takes seconds to import, so only
+        # pay for it when decoding
+        import librosa
+
+        with profiler.span("decode"):
+            self.audio, sr = librosa.load(
+                file_path,
+                sr=self.sample_rate,
+                offset=offset,
+                duration=duration
+            )
         self.duration = len(self.audio) / self.sample_rate
 
+        if self._audio_key is not None:
+            with profiler.span("cache.store"):
+                self.cache.store(self._audio_key, {"audio": self.audio})
+
+    def load_array(self, audio: np.ndarray) -> None:
+        """Use an in-memory mono signal instead of loading a file
+
+        Args:
+            audio: Mono audio samples at ``self.sample_rate``
+        """
+        self._audio_key = None
+        self.stream_path = None
+        self.offset = 0.0
+        self.audio = np.asarray(audio, dtype=np.float32)
+        self.duration = len(self.audio) / self.sample_rate
+
+    def open_stream(
+        self,
+        file_path: str,
+        duration: Optional[float] = None,
+        offset: float = 0.0
+    ) -> None:
+        """Prepare to decode an audio file block by block
+
+        Nothing is decoded yet; ``iter_features`` decodes and analyzes the
+        file incrementally, so the whole track is never held in memory.
+        ``self.audio`` stays None.
+
+        Args:
+            file_path: Path to an audio file readable by soundfile
+            duration: Optional duration limit in seconds
+            offset: Seconds into the file to start decoding at
+
+        Raises:
+            RuntimeError: If soundfile cannot read the file
+        """
+        import soundfile as sf
+
+        try:
+            info = sf.info(file_path)
+        except RuntimeError as e:
+            raise RuntimeError(f"Cannot stream {file_path}: {e}") from e
+
+        self._audio_key = None
+        self.audio = None
+        self.stream_path = file_path
+        self._stream_duration = duration
+        self.offset = offset
+        self.duration = max(0.0, info.frames / info.samplerate - offset)
+        if duration is not None:
+            self.duration = min(self.duration, duration)
+
+    def iter_features(
+        self,
+        fps: int,
+        num_samples: int = 1024,
+        first_frame: int = 0,
+        stop_frame: Optional[int] = None
+    ) -> Iterator[FrameFeatures]:
+        """Yield the per-frame feature table in consecutive chunks
+
+        For a file opened with ``open_stream`` features are computed while
+        decoding, one block at a time; otherwise the whole table from
+        ``compute_features`` is yielded as a single chunk.
+
+        Args:
+            fps: Frames per second
+            num_samples: Number of waveform samples per frame
+            first_frame: Absolute index of the first frame
+            stop_frame: Absolute frame index to stop before, None for the end
+
+        Yields:
+            FrameFeatures chunks covering consecutive frame ranges
+        """
+        if self.stream_path is None:
+            yield self.compute_features(fps, num_samples, first_frame, stop_frame)
+            return
+
+        yield from self._stream_features(fps, num_samples, first_frame, stop_frame)
+
+    def analysis_window(
+        self,
+        fps: int,
+        first_frame: int,
+        stop_frame: Optional[int],
+        num_samples: int = 1024
+    ) -> Tuple[float, Optional[float]]:
+        """Get the span of audio to decode for a range of frames
+
+        The span starts at the first frame and reaches past the last one
+        by the FFT/waveform window, so the features equal those computed
+        from the whole track.
+
+        Args:
+            fps: Frames per second
+            first_frame: Absolute index of the first frame to analyze
+            stop_frame: Absolute frame index to stop before, None for the end
+            num_samples: Number of waveform samples per frame
+
+        Returns:
+            Tuple of (offset, duration) in seconds as taken by
+            ``load_audio`` and ``open_stream``; duration is None up to the end
+        """
+        first_sample = int(frame_starts(first_frame, first_frame + 1, self.sample_rate, fps)[0])
+        offset = first_sample / self.sample_rate
+        if stop_frame is None:
+            return offset, None
+
+        stop_sample = int(frame_starts(stop_frame, stop_frame + 1, self.sample_rate, fps)[0])
+        window_length = frame_window_length(self.sample_rate, fps, self.n_fft, num_samples)
+        return offset, (stop_sample + window_length - first_sample) / self.sample_rate
+
+    def _first_sample(self, fps: int, first_frame: int) -> int:
+        """Get the absolute index of the first loaded sample
+
+        Raises:
+            ValueError: If first_frame starts before the loaded audio
+        """
+        first_sample = int(round(self.offset * self.sample_rate))
+        if frame_starts(first_frame, first_frame + 1, self.sample_rate, fps)[0] < first_sample:
+            raise ValueError(f"Frame {first_frame} starts before the loaded audio")
+        return first_sample
+
+    def _stream_features(
+        self,
+        fps: int,
+        num_samples: int,
+        first_frame: int,
+        stop_frame: Optional[int]
+    ) -> Iterator[FrameFeatures]:
+        """Decode, resample and analyze the stream block by block"""
+        import soundfile as sf
+        import soxr
+
+        window_length = frame_window_length(self.sample_rate, fps, self.n_fft, num_samples)
+        samples_per_frame = self.sample_rate / fps
+
+        with sf.SoundFile(self.stream_path) as f:
+            if self.offset:
+                f.seek(min(int(round(self.offset * f.samplerate)), f.frames))
+            max_frames = -1
+            if self._stream_duration is not None:
+                max_frames = int(self._stream_duration * f.samplerate)
+            resampler = soxr.ResampleStream(
+                f.samplerate, self.sample_rate, 1, dtype="float32", quality="HQ"
+            )
+            blocks = f.blocks(
+                blocksize=int(STREAM_BLOCK_SECONDS * f.samplerate),
+                frames=max_frames,
+                dtype="float32",
+                always_2d=True
+            )
+
+            # Resampled samples not yet consumed, starting at absolute sample buffer_start
+            buffer = np.zeros(0, dtype=np.float32)
+            buffer_start = self._first_sample(fps, first_frame)
+            next_frame = first_frame
+
+            for block in itertools.chain(blocks, [None]):
+                last = block is None
+                with profiler.span("decode"):
+                    if last:
+                        mono = np.zeros(0, dtype=np.float32)
+                    else:
+                        mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+                    resampled = resampler.resample_chunk(mono, last=last)
+                buffer = np.concatenate([buffer, resampled])
+                available = buffer_start + len(buffer)
+
+                if last:
+                    # Frames near the end are zero padded, as in compute_features
+                    ready = int(available / self.sample_rate * fps)
+                else:
+                    # Frames whose whole window has been decoded
+                    ready = max(next_frame, int((available - window_length) / samples_per_frame) + 1)
+                    while (ready > next_frame
+                           and int((ready - 1) * samples_per_frame) + window_length > available):
+                        ready -= 1
+                if stop_frame is not None:
+                    ready = min(ready, stop_frame)
+
+                if ready > next_frame:
+                    starts = frame_starts(next_frame, ready, self.sample_rate, fps)
+                    with profiler.span("features"):
+                        features = self._frame_features(
+                            buffer, buffer_start, starts,
+                            available if last else available + window_length,
+                            fps, num_samples
+                        )
+                    next_frame = ready
+                    yield features
+
+                if stop_frame is not None and next_frame >= stop_frame:
+                    return
+
+                # Drop samples before the next frame's window
+                keep_from = int(next_frame * samples_per_frame)
+                if keep_from > buffer_start:
+                    buffer = buffer[keep_from - buffer_start:]
+                    buffer_start = keep_from
+
     def get_spectrum(self, frame_idx: int, fps: int) -> np.ndarray:
         """Get frequency spectrum for a specific frame
 
@@ -70,6 +326,8 @@ class AudioAnalyzer:
         if self.audio is None:
             return np.zeros((n_mels, 1))
 
+        import librosa
+
         mel_spec = librosa.feature.melspectrogram(
             y=self.audio,
             sr=self.sample_rate,
@@ -139,6 +397,8 @@ class AudioAnalyzer:
         if self.audio is None:
             return np.array([])
 
+        import librosa
+
         # Use onset envelope for beat detection
         onset_env = librosa.onset.onset_detect(
             y=self.audio,
@@ -181,3 +441,164 @@ class AudioAnalyzer:
         # Normalize
         max_val = max(low, mid, high, 1e-10)
         return (low / max_val, mid / max_val, high / max_val)
+
+    def compute_features(
+        self,
+        fps: int,
+        num_samples: int = 1024,
+        first_frame: int = 0,
+        stop_frame: Optional[int] = None
+    ) -> FrameFeatures:
+        """Compute RMS, spectrum, band energies and waveform for every frame
+
+        Equivalent to calling ``get_rms_energy``, ``get_spectrum``,
+        ``get_waveform`` and ``get_frequency_bands`` for each frame, but
+        done with batched numpy operations over a frame-strided view of
+        the audio instead of one Python call per frame. With a cache, the
+        table is stored alongside the decoded audio and reused.
+
+        Args:
+            fps: Frames per second
+            num_samples: Number of waveform samples per frame
+            first_frame: Absolute index of the first frame; with audio
+                loaded at an offset, frames are still counted from the
+                start of the file
+            stop_frame: Absolute frame index to stop before, None for the end
+
+        Returns:
+            FrameFeatures table indexed by frame - first_frame
+        """
+        key = None
+        if self._audio_key is not None:
+            parts = ("features", self._audio_key, self.n_fft, self.hop_length, fps, num_samples)
+            if first_frame or stop_frame is not None:
+                parts += (first_frame, stop_frame)
+            key = self.cache.make_key(*parts)
+            with profiler.span("cache.load"):
+                cached = self.cache.load(key)
+            if cached is not None:
+                try:
+                    features = FrameFeatures(**cached)
+                    profiler.count("cache.hits")
+                    return features
+                except TypeError:
+                    pass
+
+        with profiler.span("features"):
+            features = self._compute_features(fps, num_samples, first_frame, stop_frame)
+        if key is not None:
+            with profiler.span("cache.store"):
+                self.cache.store(key, features.arrays())
+        return features
+
+    def _compute_features(
+        self,
+        fps: int,
+        num_samples: int,
+        first_frame: int = 0,
+        stop_frame: Optional[int] = None
+    ) -> FrameFeatures:
+        """Compute the feature table without consulting the cache"""
+        audio = self.audio if self.audio is not None else np.zeros(0, dtype=np.float32)
+        first_sample = self._first_sample(fps, first_frame)
+        track_length = first_sample + len(audio)
+        last_frame = int(track_length / self.sample_rate * fps)
+        if stop_frame is not None:
+            last_frame = min(last_frame, stop_frame)
+        starts = frame_starts(first_frame, max(first_frame, last_frame), self.sample_rate, fps)
+        return self._frame_features(audio, first_sample, starts, track_length, fps, num_samples)
+
+    def _frame_features(
+        self,
+        audio: np.ndarray,
+        first_sample: int,
+        starts: np.ndarray,
+        track_length: int,
+        fps: int,
+        num_samples: int
+    ) -> FrameFeatures:
+        """Compute features for frames starting at the given samples
+
+        Args:
+            audio: Contiguous samples beginning at absolute sample first_sample
+                and covering every frame window, except past the track end
+            first_sample: Absolute index of audio[0]
+            starts: Absolute start sample of each frame
+            track_length: Total number of samples in the track
+            fps: Frames per second
+            num_samples: Number of waveform samples per frame
+
+        Returns:
+            FrameFeatures for the given frames
+        """
+        num_bins = self.n_fft // 2 + 1
+        num_frames = len(starts)
+
+        features = FrameFeatures(
+            rms=np.zeros(num_frames, dtype=np.float32),
+            bands=np.zeros((num_frames, 3), dtype=np.float32),
+            spectrum=np.zeros((num_frames, num_bins), dtype=np.float32),
+            waveform=np.zeros((num_frames, num_samples), dtype=np.float32)
+        )
+        if num_frames == 0:
+            return features
+
+        frame_length = int(self.sample_rate / fps)
+        fft_length = min(frame_length, self.n_fft)
+
+        # Zero padding lets every window be read past the end of the track
+        window_length = frame_window_length(self.sample_rate, fps, self.n_fft, num_samples)
+        padded = np.concatenate([audio, np.zeros(window_length, dtype=audio.dtype)])
+        windows = sliding_window_view(padded, window_length)
+        offsets = starts - first_sample
+
+        # Only the first frame_length samples of each FFT window carry audio
+        fft_window = np.hanning(self.n_fft)
+        fft_window[fft_length:] = 0.0
+
+        # Number of real samples per frame (shorter at the end of the track)
+        counts = np.minimum(starts + frame_length, track_length) - starts
+        low_end = num_bins // 3
+        mid_end = 2 * num_bins // 3
+
+        for begin in range(0, num_frames, FEATURE_BATCH_FRAMES):
+            end = min(begin + FEATURE_BATCH_FRAMES, num_frames)
+            batch = windows[offsets[begin:end]]
+
+            spectrum = np.abs(np.fft.rfft(batch[:, :self.n_fft] * fft_window, axis=1))
+            features.spectrum[begin:end] = spectrum
+
+            energy = np.square(batch[:, :frame_length], dtype=np.float64).sum(axis=1)
+            rms = np.sqrt(energy / counts[begin:end])
+            features.rms[begin:end] = np.minimum(rms * 5, 1.0)  # Scale and clamp
+
+            bands = np.stack([
+                spectrum[:, :low_end].mean(axis=1),
+                spectrum[:, low_end:mid_end].mean(axis=1),
+                spectrum[:, mid_end:].mean(axis=1)
+            ], axis=1)
+            features.bands[begin:end] = bands / np.maximum(bands.max(axis=1, keepdims=True), 1e-10)
+
+            features.waveform[begin:end] = batch[:, :num_samples]
+
+        return features
+
+
+def frame_starts(first_frame: int, stop_frame: int, sample_rate: int, fps: int) -> np.ndarray:
+    """Get the first audio sample of each video frame
+
+    Args:
+        first_frame: First frame index
+        stop_frame: Frame index after the last frame
+        sample_rate: Sample rate
+        fps: Frames per second
+
+    Returns:
+        Absolute sample indices as int64
+    """
+    return (np.arange(first_frame, stop_frame) * (sample_rate / fps)).astype(np.int64)
+
+
+def frame_window_length(sample_rate: int, fps: int, n_fft: int, num_samples: int) -> int:
+    """Get the number of samples from a frame start needed for its features"""
+    return max(n_fft, num_samples, int(sample_rate / fps))
@@ -0,0 +1,167 @@
+"""On-disk cache for decoded audio and analyzed features"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+# Bump when the layout or meaning of cached arrays changes
+CACHE_VERSION = 1
+
+# Default size limit of the cache directory (2 GiB)
+DEFAULT_CACHE_BYTES = 2 * 1024 ** 3
+
+
+def default_cache_dir() -> Path:
+    """Get the default cache directory
+
+    Returns:
+        ``$MUVIZ_CACHE_DIR``, else ``$XDG_CACHE_HOME/muviz``, else ``~/.cache/muviz``
+    """
+    if os.environ.get("MUVIZ_CACHE_DIR"):
+        return Path(os.environ["MUVIZ_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "muviz"
+
+
+def hash_file(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash the contents of a file
+
+    Args:
+        file_path: Path to file
+        chunk_size: Bytes read at a time
+
+    Returns:
+        Hex SHA-256 digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Size-bounded LRU cache of named numpy arrays
+
+    Every entry is a directory of ``.npy`` files. Entries are loaded
+    memory-mapped, and the least recently used ones are evicted once the
+    cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Build a cache key from hashable parts
+
+        Args:
+            parts: Values identifying the entry (file hash, parameters, ...)
+
+        Returns:
+            Hex digest usable as an entry name
+        """
+        text = ":".join(str(part) for part in (CACHE_VERSION,) + parts)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Load an entry
+
+        Args:
+            key: Entry key
+
+        Returns:
+            Dictionary of read-only memory-mapped arrays, or None on a miss
+        """
+        entry = self.cache_dir / key
+        if not entry.is_dir():
+            return None
+
+        try:
+            arrays = {
+                path.stem: np.load(path, mmap_mode="r")
+                for path in entry.glob("*.npy")
+            }
+            # Mark as recently used
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+
+        return arrays or None
+
+    def store(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        """Store an entry, then evict old entries if over the size limit
+
+        The cache only saves time, so an entry that cannot be written
+        (unusable directory, disk full, ...) is skipped.
+
+        Args:
+            key: Entry key
+            arrays: Arrays to store, by name
+        """
+        entry = self.cache_dir / key
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write into a temporary directory and rename, so readers never
+            # see a partially written entry
+            tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_dir))
+        except OSError:
+            return
+
+        try:
+            for name, array in arrays.items():
+                np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(array))
+            try:
+                os.replace(tmp_dir, entry)
+            except OSError:
+                # Another process stored the same entry first
+                pass
+        except OSError:
+            return
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        try:
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Remove least recently used entries until under ``max_bytes``"""
+        if not self.cache_dir.is_dir():
+            return
+
+        entries = []
+        total = 0
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            try:
+                size = sum(path.stat().st_size for path in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                continue
+            total += size
+
+        # Oldest access first
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+        # Leftovers of interrupted writes
+        cutoff = time.time() - 3600
+        for tmp_dir in self.cache_dir.glob(".tmp-*"):
+            try:
+                if tmp_dir.stat().st_mtime < cutoff:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+            except OSError:
+                continue
@@ -0,0 +1,149 @@
+"""Per-frame audio feature table"""
+
+import struct
+from dataclasses import dataclass, fields
+from typing import Dict, Sequence
+
+import numpy as np
+
+# Feature store file header: magic, version, frames, spectrum bins, waveform samples
+STORE_MAGIC = b"MUVZFEAT"
+STORE_VERSION = 1
+_STORE_HEADER = struct.Struct("<8sIQII")
+
+# Arrays start at this offset, keeping them aligned
+STORE_DATA_OFFSET = 64
+
+
+@dataclass
+class FrameFeatures:
+    """Audio features for every video frame, indexed by frame
+
+    All arrays share the same first dimension (number of frames).
+    """
+    rms: np.ndarray  # (frames,) RMS energy, 0-1
+    bands: np.ndarray  # (frames, 3) low/mid/high energy, 0-1
+    spectrum: np.ndarray  # (frames, n_fft // 2 + 1) magnitude spectrum
+    waveform: np.ndarray  # (frames, waveform_samples) raw samples
+
+    def __len__(self) -> int:
+        return len(self.rms)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Get the feature arrays by field name"""
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    @classmethod
+    def concat(cls, tables: Sequence["FrameFeatures"]) -> "FrameFeatures":
+        """Join tables of consecutive frame ranges
+
+        Args:
+            tables: Tables in frame order
+
+        Returns:
+            FrameFeatures covering all frames of the given tables
+        """
+        return cls(**{
+            field.name: np.concatenate([getattr(table, field.name) for table in tables])
+            for field in fields(cls)
+        })
+
+    def save(self, path: str) -> None:
+        """Write the table to a feature store file
+
+        The file has a fixed schema: a small header followed by the rms,
+        bands, spectrum and waveform arrays as contiguous float32 data,
+        so ``open`` can map it without parsing or copying.
+
+        Args:
+            path: Output file path
+        """
+        num_frames = len(self)
+        num_bins = self.spectrum.shape[1] if self.spectrum.ndim == 2 else 0
+        num_samples = self.waveform.shape[1] if self.waveform.ndim == 2 else 0
+        header = _STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, num_frames, num_bins, num_samples)
+
+        with open(path, "wb") as f:
+            f.write(header.ljust(STORE_DATA_OFFSET, b"\0"))
+            for field in fields(self):
+                array = np.ascontiguousarray(getattr(self, field.name), dtype=np.float32)
+                f.write(memoryview(array).cast("B"))
+
+    @classmethod
+    def open(cls, path: str) -> "FrameFeatures":
+        """Map a feature store file written by ``save``
+
+        The arrays are read-only views of one shared memory map, so every
+        process opening the same file uses the same physical pages.
+
+        Args:
+            path: Feature store file path
+
+        Returns:
+            FrameFeatures backed by the file
+
+        Raises:
+            ValueError: If the file is not a feature store of this version
+        """
+        with open(path, "rb") as f:
+            header = f.read(_STORE_HEADER.size)
+        if len(header) < _STORE_HEADER.size:
+            raise ValueError(f"Not a feature store: {path}")
+        magic, version, num_frames, num_bins, num_samples = _STORE_HEADER.unpack(header)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError(f"Not a feature store: {path}")
+
+        shapes = {
+            "rms": (num_frames,),
+            "bands": (num_frames, 3),
+            "spectrum": (num_frames, num_bins),
+            "waveform": (num_frames, num_samples),
+        }
+        total = sum(int(np.prod(shape)) for shape in shapes.values())
+        if total == 0:
+            data = np.zeros(0, dtype=np.float32)
+        else:
+            data = np.memmap(path, dtype=np.float32, mode="r",
+                             offset=STORE_DATA_OFFSET, shape=(total,))
+
+        arrays = {}
+        offset = 0
+        for name, shape in shapes.items():
+            size = int(np.prod(shape))
+            arrays[name] = data[offset:offset + size].reshape(shape)
+            offset += size
+        return cls(**arrays)
+
+    def window(self, start: int, stop: int) -> "FrameFeatures":
+        """Get the features of a contiguous frame range
+
+        Args:
+            start: First frame index
+            stop: Frame index after the last frame
+
+        Returns:
+            FrameFeatures whose frame 0 is frame ``start`` of this table
+        """
+        return FrameFeatures(
+            rms=self.rms[start:stop],
+            bands=self.bands[start:stop],
+            spectrum=self.spectrum[start:stop],
+            waveform=self.waveform[start:stop]
+        )
+
+    def frame(self, frame_idx: int) -> dict:
+        """Get the audio data dictionary consumed by visualizers
+
+        Args:
+            frame_idx: Frame index
+
+        Returns:
+            Dictionary of audio features for the frame
+        """
+        low, mid, high = self.bands[frame_idx].tolist()
+        return {
+            "rms": float(self.rms[frame_idx]),
+            "spectrum": self.spectrum[frame_idx],
+            "waveform": self.waveform[frame_idx],
+            "frequency_bands": (low, mid, high)
+        }
@@ -1,7 +1,6 @@
 """Audio preprocessing module"""
 
 import numpy as np
-import librosa
 
 
 class AudioProcessor:
@@ -62,6 +61,8 @@ class AudioProcessor:
         if orig_sr == target_sr:
             return audio
 
+        import librosa
+
         return librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr)
 
     @staticmethod
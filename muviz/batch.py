@@ -0,0 +1,257 @@
+"""Rendering many audio files with a shared pool of worker processes"""
+
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+from muviz.config.settings import STYLES, THEMES, VisualizerConfig
+
+# Files picked up when a directory is given
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".ogg", ".flac", ".m4a", ".aac", ".aiff", ".aif"}
+
+# Manifest columns besides input
+MANIFEST_FIELDS = ("output", "style", "theme", "resolution")
+
+
+@dataclass
+class BatchJob:
+    """One input file to render, with optional per-job overrides"""
+    input: str
+    output: str
+    style: Optional[str] = None
+    theme: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+    def config(self, base: VisualizerConfig) -> VisualizerConfig:
+        """Apply the job's overrides to the shared config"""
+        overrides = {
+            name: value for name, value in (
+                ("style", self.style),
+                ("theme", self.theme),
+                ("width", self.width),
+                ("height", self.height),
+            )
+            if value is not None
+        }
+        return replace(base, **overrides)
+
+
+@dataclass
+class JobResult:
+    """Outcome of one batch job"""
+    job: BatchJob
+    frames: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the job succeeded"""
+        return self.error is None
+
+
+def parse_resolution(text: str) -> tuple:
+    """Parse a WIDTHxHEIGHT resolution such as ``1280x720``
+
+    Raises:
+        ValueError: If the text is not a valid resolution
+    """
+    try:
+        width, height = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid resolution '{text}', expected WIDTHxHEIGHT") from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid resolution '{text}', expected WIDTHxHEIGHT")
+    return width, height
+
+
+def default_output(input_file: str, output_dir: Optional[str]) -> str:
+    """Get the output path of an input: same name with .mp4, in output_dir if given"""
+    output = Path(input_file).with_suffix(".mp4")
+    if output_dir:
+        output = Path(output_dir) / output.name
+    return str(output)
+
+
+def find_jobs(source: str, output_dir: Optional[str] = None) -> List[BatchJob]:
+    """Collect jobs from a directory, glob pattern or manifest file
+
+    A manifest is a ``.csv`` file with a header row or a ``.json`` list of
+    objects, with an ``input`` column and optional ``output``, ``style``,
+    ``theme`` and ``resolution`` (``WIDTHxHEIGHT``) columns. Relative
+    paths in a manifest are relative to the manifest's directory.
+
+    Args:
+        source: Directory, glob pattern or manifest path
+        output_dir: Directory for outputs not given by a manifest; by
+            default next to each input
+
+    Returns:
+        Jobs in order
+
+    Raises:
+        ValueError: If the source matches nothing, a manifest is invalid,
+            or two jobs would write the same output or a job its own input
+    """
+    path = Path(source)
+    if path.is_file() and path.suffix.lower() in (".csv", ".json"):
+        jobs = list(_read_manifest(path, output_dir))
+    else:
+        if path.is_dir():
+            candidates = [str(child) for child in path.iterdir()]
+        else:
+            candidates = glob.glob(source, recursive=True)
+        inputs = sorted(
+            item for item in candidates
+            if os.path.isfile(item) and Path(item).suffix.lower() in AUDIO_EXTENSIONS
+        )
+        if not inputs:
+            raise ValueError(f"No input files found for '{source}'")
+        jobs = [BatchJob(input=item, output=default_output(item, output_dir)) for item in inputs]
+
+    _check_outputs(jobs)
+    return jobs
+
+
+def _check_outputs(jobs: List[BatchJob]):
+    """Make sure every job writes its own output, distinct from every input
+
+    Raises:
+        ValueError: If two jobs share an output or an output is an input
+    """
+    inputs = {os.path.realpath(job.input) for job in jobs}
+    owners = {}
+    for job in jobs:
+        output = os.path.realpath(job.output)
+        if output in inputs:
+            raise ValueError(f"Output {job.output} of {job.input} is also an input")
+        if output in owners:
+            raise ValueError(
+                f"{owners[output]} and {job.input} would both be written to {job.output}; "
+                "give them distinct outputs in a manifest"
+            )
+        owners[output] = job.input
+
+
+def _read_manifest(path: Path, output_dir: Optional[str]) -> Iterator[BatchJob]:
+    """Read jobs from a CSV or JSON manifest"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".json":
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    if not isinstance(rows, list):
+        raise ValueError(f"Manifest {path} must contain a list of jobs")
+
+    base_dir = path.parent
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise ValueError(f"Manifest {path}, job {number}: expected an object")
+        row = {
+            str(key).strip().lower(): str(value).strip()
+            for key, value in row.items()
+            if key is not None and value not in (None, "")
+        }
+        if not row.get("input"):
+            raise ValueError(f"Manifest {path}, job {number}: missing 'input'")
+
+        unknown = set(row) - {"input", *MANIFEST_FIELDS}
+        if unknown:
+            raise ValueError(f"Manifest {path}, job {number}: unknown columns {sorted(unknown)}")
+
+        input_file = str(base_dir / row["input"])
+        if row.get("output"):
+            output = str(base_dir / row["output"])
+        else:
+            output = default_output(input_file, output_dir)
+        if row.get("style") and row["style"] not in STYLES:
+            raise ValueError(f"Manifest {path}, job {number}: unknown style '{row['style']}'")
+        if row.get("theme") and row["theme"] not in THEMES:
+            raise ValueError(f"Manifest {path}, job {number}: unknown theme '{row['theme']}'")
+        width = height = None
+        if row.get("resolution"):
+            try:
+                width, height = parse_resolution(row["resolution"])
+            except ValueError as e:
+                raise ValueError(f"Manifest {path}, job {number}: {e}") from None
+
+        yield BatchJob(
+            input=input_file,
+            output=output,
+            style=row.get("style"),
+            theme=row.get("theme"),
+            width=width,
+            height=height
+        )
+
+
+def _warm_up():
+    """Import the rendering stack once when a worker process starts"""
+    import muviz.renderer.job  # noqa: F401
+
+
+def _run_job(job: BatchJob, base: VisualizerConfig, options: dict) -> JobResult:
+    """Render one job in a worker process"""
+    from muviz.renderer.job import render_video
+
+    start = time.perf_counter()
+    try:
+        if not os.path.isfile(job.input):
+            raise FileNotFoundError(f"Input file not found: {job.input}")
+        output_dir = os.path.dirname(os.path.abspath(job.output))
+        os.makedirs(output_dir, exist_ok=True)
+        frames = render_video(job.input, job.output, job.config(base), **options)
+    except Exception as e:
+        return JobResult(job, seconds=time.perf_counter() - start, error=str(e))
+    return JobResult(job, frames=frames, seconds=time.perf_counter() - start)
+
+
+def run_batch(
+    jobs: List[BatchJob],
+    config: VisualizerConfig,
+    processes: int = 1,
+    on_result: Optional[Callable[[JobResult], None]] = None,
+    **options
+) -> List[JobResult]:
+    """Render jobs concurrently in a persistent pool of processes
+
+    Every worker imports the rendering stack once and then renders whole
+    jobs one after another, so the startup cost is paid per worker
+    rather than per file.
+
+    Args:
+        jobs: Jobs to render
+        config: Shared config; per-job overrides are applied on a copy
+        processes: Number of jobs rendered at once
+        on_result: Called with each result as soon as its job finishes
+        options: Further keyword arguments of ``render_video`` (start,
+            duration, stream, cache)
+
+    Returns:
+        Results in job order
+    """
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_warm_up) as pool:
+        futures = {
+            pool.submit(_run_job, job, config, options): index
+            for index, job in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died, e.g. killed for running out of memory
+                result = JobResult(jobs[index], error=f"{type(e).__name__}: {e}")
+            results[index] = result
+            if on_result is not None:
+                on_result(result)
+    return results
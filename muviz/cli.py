@@ -2,12 +2,204 @@
 
 import click
 import sys
+import time
 from pathlib import Path
 
-from muviz.config.settings import VisualizerConfig
+from muviz.config.settings import STYLES, THEMES, VisualizerConfig
+from muviz.profiling import profiler
 
 
-@click.command()
+class DefaultGroup(click.Group):
+    """Command group that runs ``render`` when no command is named
+
+    Keeps ``muviz INPUT_FILE [OPTIONS]`` working alongside subcommands.
+    """
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ctx.help_option_names:
+            args = ["render"] + list(args)
+        return super().parse_args(ctx, args)
+
+
+# Options shared by the render and batch commands, in help order
+RENDER_OPTIONS = [
+    click.option(
+        "--style",
+        type=click.Choice(STYLES),
+        default="geometric",
+        help="Visualization style"
+    ),
+    click.option(
+        "--width",
+        type=int,
+        default=1920,
+        help="Video width"
+    ),
+    click.option(
+        "--height",
+        type=int,
+        default=1080,
+        help="Video height"
+    ),
+    click.option(
+        "--fps",
+        type=int,
+        default=30,
+        help="Frames per second"
+    ),
+    click.option(
+        "--theme",
+        type=click.Choice(list(THEMES)),
+        default="cosmic",
+        help="Color theme"
+    ),
+    click.option(
+        "--duration",
+        type=float,
+        default=0,
+        help="Duration in seconds (0 for full audio)"
+    ),
+    click.option(
+        "--start",
+        type=click.FloatRange(min=0),
+        default=0,
+        help="Start time in seconds; only this part of the audio is decoded"
+    ),
+    click.option(
+        "--end",
+        type=click.FloatRange(min=0),
+        default=None,
+        help="End time in seconds (overrides --duration)"
+    ),
+    click.option(
+        "--backend",
+        type=click.Choice(["auto", "ffmpeg", "moviepy", "cv2"]),
+        default="auto",
+        help="Video encoding backend"
+    ),
+    click.option(
+        "--preset",
+        type=click.Choice([
+            "ultrafast", "superfast", "veryfast", "faster", "fast",
+            "medium", "slow", "slower", "veryslow"
+        ]),
+        default="medium",
+        help="Encoder speed/compression preset"
+    ),
+    click.option(
+        "--crf",
+        type=click.IntRange(0, 51),
+        default=23,
+        help="Encoder constant rate factor (lower is better quality)"
+    ),
+    click.option(
+        "--threads",
+        type=click.IntRange(min=0),
+        default=0,
+        help="Encoder threads (0 for automatic)"
+    ),
+    click.option(
+        "--encoders",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Number of video segments encoded in parallel (ffmpeg backend)"
+    ),
+    click.option(
+        "--seed",
+        type=click.IntRange(min=0),
+        default=0,
+        help="Seed for random visual elements; the same seed renders the same video"
+    ),
+    click.option(
+        "--workers",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Number of processes rendering frames in parallel"
+    ),
+    click.option(
+        "--cache-dir",
+        type=click.Path(file_okay=False),
+        default=None,
+        help="Directory caching decoded audio and features "
+             "(default: $MUVIZ_CACHE_DIR or ~/.cache/muviz)"
+    ),
+    click.option(
+        "--cache-size",
+        type=click.IntRange(min=0),
+        default=2048,
+        help="Maximum cache size in MB"
+    ),
+    click.option(
+        "--no-cache",
+        is_flag=True,
+        default=False,
+        help="Do not read or write the analysis cache"
+    ),
+    click.option(
+        "--stream",
+        is_flag=True,
+        default=False,
+        help="Decode and analyze the audio block by block (for very long inputs)"
+    ),
+]
+
+
+def render_options(func):
+    """Add the options shared by the render and batch commands"""
+    for option in reversed(RENDER_OPTIONS):
+        func = option(func)
+    return func
+
+
+def make_config(style, width, height, fps, theme, backend, preset, crf, threads,
+                encoders, seed, workers, **_) -> VisualizerConfig:
+    """Build the visualization config from command-line options"""
+    return VisualizerConfig(
+        width=width,
+        height=height,
+        fps=fps,
+        style=style,
+        theme=theme,
+        backend=backend,
+        encoder_preset=preset,
+        encoder_crf=crf,
+        encoder_threads=threads,
+        encoder_workers=encoders,
+        workers=workers,
+        seed=seed
+    )
+
+
+def make_window(start, end, duration, **_) -> dict:
+    """Get the ``render_video`` start and duration arguments from command-line options
+
+    Raises:
+        click.BadParameter: If the end time is not after the start time
+    """
+    if end is not None:
+        if end <= start:
+            raise click.BadParameter("must be after --start", param_hint="--end")
+        duration = end - start
+    return {"start": start, "duration": duration if duration > 0 else None}
+
+
+def make_cache(cache_dir, cache_size, no_cache, **_):
+    """Build the analysis cache from command-line options, None if disabled"""
+    if no_cache:
+        return None
+    from muviz.audio.cache import FeatureCache
+    return FeatureCache(cache_dir, max_bytes=cache_size * 1024 * 1024)
+
+
+@click.group(cls=DefaultGroup)
+def main():
+    """Muviz - Convert audio to visualization video
+
+    `muviz INPUT_FILE [OPTIONS]` is short for `muviz render INPUT_FILE [OPTIONS]`.
+    """
+
+
+@main.command()
 @click.argument("input_file", type=click.Path(exists=True))
 @click.option(
     "-o", "--output",
@@ -15,104 +207,153 @@ from muviz.config.settings import VisualizerConfig
     default=None,
     help="Output video file path"
 )
+@render_options
 @click.option(
-    "--style",
-    type=click.Choice(["geometric", "particle", "abstract"]),
-    default="geometric",
-    help="Visualization style"
-)
-@click.option(
-    "--width",
-    type=int,
-    default=1920,
-    help="Video width"
-)
-@click.option(
-    "--height",
-    type=int,
-    default=1080,
-    help="Video height"
+    "--preview",
+    is_flag=True,
+    default=False,
+    help="Quick low-resolution preview (at most 480p at 12 fps, fastest encoder)"
 )
 @click.option(
-    "--fps",
-    type=int,
-    default=30,
-    help="Frames per second"
+    "--work-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Checkpoint finished segments here and resume an interrupted render"
 )
 @click.option(
-    "--theme",
-    type=click.Choice(["cosmic", "neon", "pastel"]),
-    default="cosmic",
-    help="Color theme"
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Print per-stage timing, throughput and memory report"
 )
 @click.option(
-    "--duration",
-    type=float,
-    default=0,
-    help="Duration in seconds (0 for full audio)"
+    "--profile-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the profiling report as JSON to this file"
 )
-def main(input_file, output, style, width, height, fps, theme, duration):
-    """Muviz - Convert audio to visualization video
+def render(input_file, output, preview, work_dir, profile, profile_json, **options):
+    """Render one audio file
 
     INPUT_FILE: Path to audio file (wav, mp3, ogg, etc.)
     """
     # Set up output path
     if output is None:
         input_path = Path(input_file)
-        output = str(input_path.with_suffix(".mp4"))
+        suffix = ".preview.mp4" if preview else ".mp4"
+        output = str(input_path.with_suffix(suffix))
 
     # Create config
-    config = VisualizerConfig(
-        width=width,
-        height=height,
-        fps=fps,
-        style=style,
-        theme=theme
-    )
+    config = make_config(**options)
+    window = make_window(**options)
+    if preview:
+        config = config.preview()
+
+    if profile or profile_json:
+        profiler.enable()
 
     click.echo(f"Loading audio: {input_file}")
     click.echo(f"Output: {output}")
-    click.echo(f"Style: {style}, Theme: {theme}, Resolution: {width}x{height}@{fps}fps")
+    click.echo(
+        f"Style: {config.style}, Theme: {config.theme}, "
+        f"Resolution: {config.width}x{config.height}@{config.fps}fps"
+    )
 
     try:
-        from muviz.audio.analyzer import AudioAnalyzer
-        from muviz.visualizer.geometric import GeometricVisualizer
-        from muviz.visualizer.particle import ParticleVisualizer
-        from muviz.visualizer.abstract import AbstractVisualizer
-        from muviz.renderer.frame_generator import FrameGenerator
-        from muviz.renderer.video_writer import VideoWriter
-
-        # Analyze audio
-        analyzer = AudioAnalyzer()
-        analyzer.load_audio(input_file, duration if duration > 0 else None)
-
-        # Update config with audio sample rate
-        config.sample_rate = analyzer.sample_rate
-
-        # Select visualizer
-        if style == "geometric":
-            visualizer = GeometricVisualizer(config)
-        elif style == "particle":
-            visualizer = ParticleVisualizer(config)
-        else:
-            visualizer = AbstractVisualizer(config)
+        from muviz.renderer.job import render_video
 
-        # Generate frames
-        click.echo("Generating visualization frames...")
-        frame_generator = FrameGenerator(analyzer, visualizer, config)
-        frames = frame_generator.generate_frames()
-
-        # Write video
-        click.echo("Writing video file...")
-        writer = VideoWriter(config)
-        writer.write_video(frames, analyzer.audio, output)
+        render_video(
+            input_file,
+            output,
+            config,
+            **window,
+            stream=options["stream"],
+            cache=make_cache(**options),
+            work_dir=work_dir,
+            echo=click.echo
+        )
 
         click.echo(f"Done! Video saved to: {output}")
 
+        if profile:
+            click.echo(profiler.format_report(), err=True)
+        if profile_json:
+            profiler.write_json(profile_json)
+
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
         sys.exit(1)
 
 
+@main.command()
+@click.argument("source")
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for output videos (default: next to each input)"
+)
+@click.option(
+    "-j", "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of files rendered at once"
+)
+@render_options
+def batch(source, output_dir, jobs, **options):
+    """Render many audio files with a shared pool of processes
+
+    SOURCE: Directory, glob pattern (quoted) or manifest (.csv or .json
+    with input, output, style, theme and resolution columns)
+    """
+    from muviz.batch import find_jobs, run_batch
+
+    window = make_window(**options)
+    try:
+        batch_jobs = find_jobs(source, output_dir)
+    except (OSError, ValueError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    processes = min(jobs, len(batch_jobs))
+    click.echo(f"Rendering {len(batch_jobs)} file(s) with {processes} process(es)")
+    done = 0
+
+    def report(result):
+        nonlocal done
+        done += 1
+        prefix = f"[{done}/{len(batch_jobs)}]"
+        if result.ok:
+            rate = result.frames / result.seconds if result.seconds > 0 else 0.0
+            click.echo(
+                f"{prefix} ok     {result.job.input} -> {result.job.output} "
+                f"({result.frames} frames, {result.seconds:.1f} s, {rate:.1f} frames/s)"
+            )
+        else:
+            click.echo(f"{prefix} failed {result.job.input}: {result.error}", err=True)
+
+    start = time.perf_counter()
+    results = run_batch(
+        batch_jobs,
+        make_config(**options),
+        processes=processes,
+        on_result=report,
+        **window,
+        stream=options["stream"],
+        cache=make_cache(**options)
+    )
+    wall = time.perf_counter() - start
+
+    failed = sum(1 for result in results if not result.ok)
+    frames = sum(result.frames for result in results)
+    rate = frames / wall if wall > 0 else 0.0
+    click.echo(
+        f"Finished {len(results) - failed}/{len(results)} file(s), {failed} failed: "
+        f"{frames} frames in {wall:.1f} s ({rate:.1f} frames/s)"
+    )
+    if failed:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
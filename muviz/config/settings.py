@@ -1,8 +1,12 @@
 """Configuration settings for muviz"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import List, Tuple
 
+# Preview renders are at most 480p at 12 fps
+PREVIEW_HEIGHT = 480
+PREVIEW_FPS = 12
+
 
 @dataclass
 class VisualizerConfig:
@@ -13,6 +17,38 @@ class VisualizerConfig:
     style: str = "geometric"  # geometric, particle, abstract
     theme: str = "cosmic"  # cosmic, neon, pastel
     sample_rate: int = 22050
+    backend: str = "auto"  # auto, ffmpeg, moviepy, cv2
+    encoder_preset: str = "medium"  # libx264 preset
+    encoder_crf: int = 23  # libx264 constant rate factor (0-51)
+    encoder_threads: int = 0  # 0 lets ffmpeg decide
+    encoder_workers: int = 1  # concurrent segment encoders (ffmpeg backend)
+    encoder_segment_frames: int = 0  # frames per encoded segment, 0 for one second
+    checkpoint_frames: int = 0  # frames per resumable segment, 0 for ten seconds
+    workers: int = 1  # render processes
+    segment_frames: int = 30  # frames per parallel render segment
+    feature_queue_chunks: int = 2  # feature chunks analyzed ahead of rendering, 0 for inline
+    render_queue_segments: int = 0  # parallel render segments in flight, 0 for workers + 1
+    encode_queue_frames: int = 4  # frames rendered ahead of the encoder, 0 for inline
+    seed: int = 0  # seed for random visual elements
+    max_particles: int = 200  # particle style capacity
+
+    def preview(self) -> "VisualizerConfig":
+        """Get a config for a quick low-resolution preview of this render
+
+        Returns:
+            Copy scaled down to at most PREVIEW_HEIGHT lines (keeping the
+            aspect ratio) and PREVIEW_FPS, with the fastest encoder preset
+        """
+        height = min(self.height, PREVIEW_HEIGHT)
+        # libx264 with yuv420p needs even dimensions
+        width = max(2, round(self.width * height / self.height / 2) * 2)
+        return replace(
+            self,
+            width=width,
+            height=height - height % 2,
+            fps=min(self.fps, PREVIEW_FPS),
+            encoder_preset="ultrafast"
+        )
 
 
 @dataclass
@@ -24,6 +60,9 @@ class AudioConfig:
     n_mels: int = 128
 
 
+# Visualization styles
+STYLES = ("geometric", "particle", "abstract")
+
 # Color themes
 THEMES = {
     "cosmic": {
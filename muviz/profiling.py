@@ -0,0 +1,190 @@
+"""Lightweight per-stage timing and throughput instrumentation"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# Shared no-op context returned while profiling is disabled
+_NULL_SPAN = nullcontext()
+
+
+@dataclass
+class StageStats:
+    """Accumulated timings of one named stage"""
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+
+
+class Profiler:
+    """Collects wall/CPU time per stage and named counters
+
+    Stages are recorded with ``span`` context managers and can be nested;
+    each stage is timed independently, so an outer stage includes the
+    time of the stages inside it. While disabled every call is a no-op.
+
+    Stages may run concurrently in several threads, so a span's CPU time
+    is that of its own thread, and updates are serialized by a lock.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        """Reset all measurements and start recording"""
+        self.stages = {}
+        self.counters = {}
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop recording, keeping measurements so far"""
+        self.enabled = False
+
+    def span(self, name: str):
+        """Time a stage
+
+        Args:
+            name: Stage name
+
+        Returns:
+            Context manager recording the time spent inside it
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name: str):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            with self._lock:
+                stats = self.stages.get(name)
+                if stats is None:
+                    stats = self.stages[name] = StageStats()
+                stats.calls += 1
+                stats.wall += wall
+                stats.cpu += cpu
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increment a counter
+
+        Args:
+            name: Counter name
+            amount: Value to add
+        """
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> dict:
+        """Summarize measurements
+
+        Returns:
+            Dictionary with per-stage wall/CPU seconds, counters, overall
+            frames per second and peak resident memory in MB
+        """
+        wall = time.perf_counter() - self._start_wall
+        frames = self.counters.get("frames", 0)
+
+        stages = {}
+        with self._lock:
+            snapshot = list(self.stages.items())
+        for name, stats in snapshot:
+            stages[name] = {
+                "calls": stats.calls,
+                "wall_s": stats.wall,
+                "cpu_s": stats.cpu,
+                "ms_per_call": 1000 * stats.wall / stats.calls if stats.calls else 0.0,
+            }
+
+        return {
+            "wall_s": wall,
+            "cpu_s": time.process_time() - self._start_cpu,
+            "frames": frames,
+            "frames_per_sec": frames / wall if wall > 0 else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": stages,
+            "counters": dict(self.counters),
+        }
+
+    def format_report(self) -> str:
+        """Format the report as a human readable table
+
+        Returns:
+            Multi-line report text
+        """
+        report = self.report()
+        lines = [
+            f"{'stage':<24}{'calls':>8}{'wall s':>10}{'cpu s':>10}{'ms/call':>10}",
+        ]
+        for name, stats in report["stages"].items():
+            lines.append(
+                f"{name:<24}{stats['calls']:>8}{stats['wall_s']:>10.3f}"
+                f"{stats['cpu_s']:>10.3f}{stats['ms_per_call']:>10.3f}"
+            )
+
+        lines.append(
+            f"total: {report['wall_s']:.3f} s wall, {report['cpu_s']:.3f} s cpu, "
+            f"{report['frames']} frames, {report['frames_per_sec']:.2f} frames/s"
+        )
+        if report["peak_rss_mb"] is not None:
+            lines.append(f"peak RSS: {report['peak_rss_mb']:.1f} MB")
+        for name, value in report["counters"].items():
+            if name != "frames":
+                lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+    def write_json(self, path: str) -> None:
+        """Write the report to a JSON file
+
+        Args:
+            path: Output file path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Get the peak resident set size of this process
+
+    Child processes such as ffmpeg are not included: for children started
+    by fork the kernel's figure is the parent's RSS at the fork, not their
+    own, so it would only repeat this process's number.
+
+    Returns:
+        Peak RSS in MB, or None where the resource module is unavailable
+    """
+    if not RESOURCE_AVAILABLE:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+# Process-wide profiler used by all muviz modules
+profiler = Profiler()
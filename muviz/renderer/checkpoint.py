@@ -0,0 +1,276 @@
+"""Checkpointed rendering that resumes after an interruption"""
+
+import hashlib
+import itertools
+import json
+import os
+from collections import deque
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from muviz.config.settings import VisualizerConfig
+from muviz.profiling import profiler
+from muviz.renderer.frame_generator import FrameGenerator
+from muviz.renderer.video_writer import VideoWriter
+from muviz.visualizer.base import Frame
+
+# Bump when the work directory layout changes
+CHECKPOINT_VERSION = 1
+
+# Config fields that change how fast a render runs but not its output
+_SPEED_ONLY_FIELDS = (
+    "workers", "encoder_workers", "encoder_threads",
+    "feature_queue_chunks", "render_queue_segments", "encode_queue_frames",
+)
+
+
+def checkpoint_segment_frames(config: VisualizerConfig) -> int:
+    """Get the number of frames per checkpointed segment"""
+    return config.checkpoint_frames or 10 * config.fps
+
+
+def render_fingerprint(config: VisualizerConfig, *parts) -> str:
+    """Identify the output of a render
+
+    Args:
+        config: Visualization config
+        parts: Further values the output depends on (input hash, duration, ...)
+
+    Returns:
+        Hex digest that changes whenever the rendered video would
+    """
+    settings = {
+        name: value for name, value in asdict(config).items()
+        if name not in _SPEED_ONLY_FIELDS
+    }
+    text = json.dumps(
+        [CHECKPOINT_VERSION, settings, [str(part) for part in parts]],
+        sort_keys=True
+    )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RenderCheckpoint:
+    """Finished segments and visualizer state of a render in progress
+
+    The work directory holds ``manifest.json``, the encoded segments in
+    order and a snapshot of the visualizer state after the last finished
+    segment. The manifest is replaced atomically after every segment, so
+    it only ever lists complete segments.
+    """
+
+    def __init__(self, work_dir: str, fingerprint: str):
+        self.work_dir = Path(work_dir)
+        self.fingerprint = fingerprint
+        self.segments: List[dict] = []
+        self.state_file: Optional[str] = None
+        self._load()
+
+    @property
+    def manifest_path(self) -> Path:
+        """Path of the manifest file"""
+        return self.work_dir / "manifest.json"
+
+    @property
+    def frames_done(self) -> int:
+        """Number of frames in finished segments"""
+        return sum(segment["frames"] for segment in self.segments)
+
+    @property
+    def segment_paths(self) -> List[str]:
+        """Paths of the finished segments, in order"""
+        return [str(self.work_dir / segment["file"]) for segment in self.segments]
+
+    def segment_path(self, index: int) -> str:
+        """Get the path of a segment by index"""
+        return str(self.work_dir / f"segment-{index:06d}.mp4")
+
+    def _load(self):
+        """Pick up the manifest of an earlier run of the same render"""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if (manifest.get("version") != CHECKPOINT_VERSION
+                or manifest.get("fingerprint") != self.fingerprint):
+            # Leftovers of a different render
+            self.clear()
+            return
+
+        # Keep segments up to the first one that went missing
+        for segment in manifest.get("segments", []):
+            if not (self.work_dir / segment["file"]).is_file():
+                break
+            self.segments.append(segment)
+        if len(self.segments) == len(manifest.get("segments", [])):
+            self.state_file = manifest.get("state")
+
+    def load_state(self) -> Optional[Dict[str, np.ndarray]]:
+        """Load the visualizer state after the last finished segment
+
+        Returns:
+            Snapshot as taken by ``state_dict``, or None if there is none
+        """
+        if self.state_file is None:
+            return None
+        try:
+            with np.load(self.work_dir / self.state_file) as data:
+                return {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return None
+
+    def commit(self, path: str, frames: int, state: Optional[Dict[str, np.ndarray]]):
+        """Record a finished segment
+
+        Args:
+            path: Encoded segment file, inside the work directory
+            frames: Number of frames in the segment
+            state: Visualizer state after the segment's last frame, if known
+        """
+        index = len(self.segments)
+        old_state = self.state_file
+        self.segments.append({"file": os.path.basename(path), "frames": frames})
+
+        self.state_file = None
+        if state is not None:
+            self.state_file = f"state-{index:06d}.npz"
+            tmp_path = self.work_dir / f".{self.state_file}"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **state)
+            os.replace(tmp_path, self.work_dir / self.state_file)
+
+        manifest = {
+            "version": CHECKPOINT_VERSION,
+            "fingerprint": self.fingerprint,
+            "segments": self.segments,
+            "state": self.state_file,
+        }
+        tmp_path = self.work_dir / ".manifest.json"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+        if old_state is not None and old_state != self.state_file:
+            (self.work_dir / old_state).unlink(missing_ok=True)
+
+    def clear(self):
+        """Remove all checkpoint files, e.g. once the output is written"""
+        self.segments = []
+        self.state_file = None
+        if not self.work_dir.is_dir():
+            return
+        for pattern in ("manifest.json", ".manifest.json", "segment-*.mp4", "state-*.npz",
+                        ".state-*.npz", "concat.txt"):
+            for path in self.work_dir.glob(pattern):
+                path.unlink(missing_ok=True)
+
+
+def render_resumable(
+    frame_generator: FrameGenerator,
+    writer: VideoWriter,
+    audio: Union[np.ndarray, str, None],
+    output_path: str,
+    checkpoint: RenderCheckpoint,
+    audio_start: float = 0.0
+):
+    """Render into checkpointed segments, then join them into the video
+
+    Segments already finished by an earlier run are skipped and the
+    visualizer continues from the saved state, so the result is the same
+    as an uninterrupted render. With a single encoder worker frames are
+    piped into the segment's encoder as they are rendered; with more,
+    whole segments are buffered for ``config.encoder_workers`` concurrent
+    encoders like with segment encoding.
+
+    Args:
+        frame_generator: Frame generator of the render
+        writer: Video writer, encoding with ffmpeg
+        audio: Mono audio array, audio file path or None
+        output_path: Output video file path
+        checkpoint: Checkpoint in the work directory
+        audio_start: Seconds into an audio file where the video starts
+    """
+    config = frame_generator.config
+    segment_frames = checkpoint_segment_frames(config)
+    checkpoint.work_dir.mkdir(parents=True, exist_ok=True)
+
+    # Only a serial render advances the visualizer of this process
+    serial = config.workers <= 1
+    state = checkpoint.load_state() if serial else None
+    frames = frame_generator.iter_frames(frame_generator.start_frame + checkpoint.frames_done, state)
+
+    if config.encoder_workers <= 1:
+        while True:
+            segment = itertools.islice(frames, segment_frames)
+            first = next(segment, None)
+            if first is None:
+                break
+            path = checkpoint.segment_path(len(checkpoint.segments))
+            # A segment interrupted half way is dropped and rendered again
+            written = writer.write_segment(itertools.chain([first], segment), path)
+            # The visualizer has just rendered the segment's last frame
+            snapshot = frame_generator.visualizer.state_dict() if serial else None
+            checkpoint.commit(path, written, snapshot)
+    else:
+        _render_buffered(frame_generator, writer, frames, checkpoint, segment_frames)
+
+    with profiler.span("mux"):
+        writer.concat_segments(
+            checkpoint.segment_paths, audio, output_path, audio_start,
+            checkpoint.frames_done / config.fps
+        )
+
+
+def _render_buffered(
+    frame_generator: FrameGenerator,
+    writer: VideoWriter,
+    frames: Iterator[Frame],
+    checkpoint: RenderCheckpoint,
+    segment_frames: int
+):
+    """Encode whole segments with concurrent encoders and record them in order"""
+    config = frame_generator.config
+    serial = config.workers <= 1
+    pending = deque()
+    try:
+        while True:
+            segment = list(itertools.islice(frames, segment_frames))
+            if not segment:
+                break
+            # The visualizer has just rendered the segment's last frame
+            snapshot = frame_generator.visualizer.state_dict() if serial else None
+
+            if len(pending) >= config.encoder_workers:
+                with profiler.span("encode.wait"):
+                    _commit_oldest(pending, checkpoint)
+
+            path = checkpoint.segment_path(len(checkpoint.segments) + len(pending))
+            pending.append((writer.encode_segment(segment, path), path, len(segment), snapshot))
+
+        with profiler.span("encode.wait"):
+            while pending:
+                _commit_oldest(pending, checkpoint)
+    except BaseException:
+        # Segments handed to encoders hold all their frames, so keep
+        # whichever of them still encode successfully
+        try:
+            while pending:
+                _commit_oldest(pending, checkpoint)
+        except Exception:
+            pass
+        raise
+    finally:
+        while pending:
+            pending.popleft()[0].abort()
+
+
+def _commit_oldest(pending: deque, checkpoint: RenderCheckpoint):
+    """Wait for the oldest segment encoder and record its segment"""
+    encoder, path, frames, snapshot = pending.popleft()
+    encoder.finish()
+    checkpoint.commit(path, frames, snapshot)
@@ -1,61 +1,294 @@
 """Frame generation module"""
 
-import numpy as np
-from typing import List
-from PIL import Image
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple, Type
 
 from muviz.audio.analyzer import AudioAnalyzer
-from muviz.visualizer.base import BaseVisualizer
+from muviz.audio.features import FrameFeatures
+from muviz.visualizer.base import BaseVisualizer, Frame, FramePool
 from muviz.config.settings import VisualizerConfig
+from muviz.profiling import profiler
+from muviz.renderer.pipeline import prefetch
 
 
 class FrameGenerator:
-    """Generates video frames from audio analysis and visualizer"""
+    """Generates video frames from audio analysis and visualizer
+
+    The video covers frames start_frame up to stop_frame (None for the end
+    of the audio). Frame indices are absolute, counted from the start of
+    the track, so a window renders the same frames as a full render.
+
+    With pool_frames above 0 serially rendered frames are drawn into a
+    pool of that many reused buffers, and the consumer must release each
+    frame to ``frame_pool`` once done with it.
+    """
 
     def __init__(
         self,
         analyzer: AudioAnalyzer,
         visualizer: BaseVisualizer,
-        config: VisualizerConfig
+        config: VisualizerConfig,
+        start_frame: int = 0,
+        stop_frame: Optional[int] = None,
+        pool_frames: int = 0
     ):
         self.analyzer = analyzer
         self.visualizer = visualizer
         self.config = config
+        self.start_frame = start_frame
+        self.stop_frame = stop_frame
+        self.frame_pool = None
+        if pool_frames > 0:
+            self.frame_pool = FramePool(config.height, config.width, pool_frames)
+            visualizer.frame_pool = self.frame_pool
 
-    def generate_frames(self) -> List[Image.Image]:
-        """Generate all frames for the video
+    @property
+    def num_frames(self) -> int:
+        """Number of frames in the video"""
+        end = int((self.analyzer.offset + self.analyzer.duration) * self.config.fps)
+        if self.stop_frame is not None:
+            end = min(end, self.stop_frame)
+        return max(0, end - self.start_frame)
 
-        Returns:
-            List of PIL Image frames
+    def iter_frames(
+        self,
+        start_frame: Optional[int] = None,
+        state: Optional[dict] = None
+    ) -> Iterator[Frame]:
+        """Lazily render frames one at a time
+
+        Only the frame currently being consumed is kept alive, so memory
+        use does not grow with the length of the track. Features are
+        consumed chunk by chunk, so a streamed analyzer is never read
+        ahead further than one decode block.
+
+        With ``config.workers`` above 1 frames are rendered by a pool of
+        processes, one contiguous segment at a time, and yielded in order.
+        Features are analyzed in a background thread, up to
+        ``config.feature_queue_chunks`` chunks ahead of rendering.
+
+        Args:
+            start_frame: Absolute index of the first frame to render, by
+                default ``self.start_frame``; earlier frames are skipped
+            state: Visualizer snapshot taken right before start_frame. Without
+                one the visualizer is warmed up on the preceding frames, which
+                gives the same result. Ignored when rendering in parallel.
+
+        Yields:
+            Frames in order, as returned by the visualizer
         """
-        fps = self.config.fps
-        duration = self.analyzer.duration
-        num_frames = int(duration * fps)
+        if start_frame is None:
+            start_frame = self.start_frame
+        if self.config.workers > 1:
+            state = None
 
-        frames = []
-        for frame_idx in range(num_frames):
-            # Get audio data for this frame
-            audio_data = self._get_audio_data(frame_idx, fps)
+        # Frames from warm_from up to start_frame only advance the state
+        warm_from = start_frame
+        if state is None and start_frame > 0:
+            warm_from = max(0, start_frame - type(self.visualizer).warmup_frames)
+        chunks = prefetch(
+            self.analyzer.iter_features(
+                self.config.fps, first_frame=warm_from, stop_frame=self.stop_frame
+            ),
+            self.config.feature_queue_chunks,
+            name="muviz-analyze"
+        )
+        if self.config.workers > 1:
+            yield from self._iter_frames_parallel(chunks, start_frame, warm_from)
+            return
 
-            # Render frame
-            frame = self.visualizer.render_frame(audio_data)
-            frames.append(frame)
+        if state is not None:
+            self.visualizer.load_state_dict(state)
+        elif start_frame > 0:
+            self.visualizer.reset()
+            self.visualizer.frame_idx = warm_from
 
-        return frames
+        chunk_start = warm_from
+        for features in chunks:
+            for frame_idx in range(len(features)):
+                # Get audio data for this frame
+                audio_data = features.frame(frame_idx)
 
-    def _get_audio_data(self, frame_idx: int, fps: int) -> dict:
-        """Get audio features for a specific frame
+                if chunk_start + frame_idx < start_frame:
+                    self.visualizer.update(audio_data)
+                    self.visualizer.advance_frame()
+                    continue
 
-        Args:
-            frame_idx: Frame index
-            fps: Frames per second
+                # Render frame
+                with profiler.span("render"):
+                    frame = self.visualizer.render_frame(audio_data)
+                profiler.count("frames")
+                yield frame
+            chunk_start += len(features)
+
+    def _iter_segments(
+        self,
+        chunks: Iterable[FrameFeatures],
+        store_dir: str,
+        start_frame: int = 0,
+        chunks_start: int = 0
+    ) -> Iterator[Tuple[str, int, int, int, int]]:
+        """Split feature chunks into render segments with warm-up history
+
+        Each chunk, together with up to ``warmup_frames`` frames before it,
+        is written to a feature store file in store_dir, which workers map
+        instead of receiving pickled feature arrays. The first chunk
+        begins at absolute frame chunks_start.
+
+        Yields:
+            Tuples of (store_path, store_start, first_frame, start, stop) as
+            taken by ``render_segment``
+        """
+        segment_frames = max(1, self.config.segment_frames)
+        warmup = type(self.visualizer).warmup_frames
+
+        # Features of the current chunk plus up to warmup earlier frames
+        context = None
+        context_start = chunks_start
+        for chunk_idx, chunk in enumerate(chunks):
+            if context is None:
+                chunk_start = chunks_start
+                context = chunk
+            else:
+                chunk_start = context_start + len(context)
+                keep = min(warmup, len(context))
+                context_start = chunk_start - keep
+                context = FrameFeatures.concat([
+                    context.window(len(context) - keep, len(context)),
+                    chunk
+                ])
+
+            chunk_stop = chunk_start + len(chunk)
+            if chunk_stop <= start_frame:
+                continue
+
+            store_path = os.path.join(store_dir, f"chunk-{chunk_idx}.features")
+            with profiler.span("features.store"):
+                context.save(store_path)
+
+            for start in range(max(chunk_start, start_frame), chunk_stop, segment_frames):
+                stop = min(start + segment_frames, chunk_stop)
+                first = max(context_start, start - warmup)
+                yield store_path, context_start, first, start, stop
+
+    def _iter_frames_parallel(
+        self,
+        chunks: Iterable[FrameFeatures],
+        start_frame: int = 0,
+        chunks_start: int = 0
+    ) -> Iterator[Frame]:
+        """Render frame segments in worker processes and yield them in order
+
+        Each worker builds its own visualizer and seeks it to the segment
+        start, so the output is identical to a serial render. At most
+        ``config.render_queue_segments`` (by default ``workers + 1``)
+        segments are in flight to bound memory. Features
+        reach the workers through memory-mapped store files, so all
+        workers share one copy and only small tuples are pickled.
+        """
+        workers = self.config.workers
+        visualizer_cls = type(self.visualizer)
+        store_dir = tempfile.mkdtemp(prefix="muviz-features-")
+        segments = self._iter_segments(chunks, store_dir, start_frame, chunks_start)
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context()) as pool:
+                pending = deque()
+
+                def submit_next():
+                    segment = next(segments, None)
+                    if segment is None:
+                        return
+                    future = pool.submit(render_segment, visualizer_cls, self.config, *segment)
+                    pending.append((future, segment[0]))
+
+                for _ in range(self.config.render_queue_segments or workers + 1):
+                    submit_next()
+
+                while pending:
+                    future, store_path = pending.popleft()
+                    # Rendering happens in the workers; this is time spent waiting
+                    with profiler.span("render.wait"):
+                        frames = future.result()
+                    submit_next()
+
+                    # Segments come in order, so no later one uses an older chunk
+                    if not pending or pending[0][1] != store_path:
+                        os.remove(store_path)
+
+                    profiler.count("frames", len(frames))
+                    yield from frames
+        finally:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+    def generate_frames(self) -> List[Frame]:
+        """Generate all frames for the video
 
         Returns:
-            Dictionary of audio features
+            List of frames
+
+        Raises:
+            RuntimeError: If frames are drawn into a frame pool, which would
+                run out of buffers since none are released
         """
-        return {
-            "rms": self.analyzer.get_rms_energy(frame_idx, fps),
-            "spectrum": self.analyzer.get_spectrum(frame_idx, fps),
-            "waveform": self.analyzer.get_waveform(frame_idx, fps),
-            "frequency_bands": self.analyzer.get_frequency_bands(frame_idx, fps)
-        }
+        if self.frame_pool is not None:
+            raise RuntimeError("generate_frames cannot hold all frames of a frame pool; use iter_frames")
+        return list(self.iter_frames())
+
+
+def _worker_context():
+    """Get the multiprocessing context for render worker processes
+
+    The pool is started while the analysis and render threads run, and
+    forking a multi-threaded process can leave a child waiting forever on
+    a lock another thread held at the fork, so workers are started from a
+    fork server (or spawned where there is none) instead.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+@lru_cache(maxsize=2)
+def _open_store(store_path: str) -> FrameFeatures:
+    """Map a feature store file once per worker process"""
+    return FrameFeatures.open(store_path)
+
+
+def render_segment(
+    visualizer_cls: Type[BaseVisualizer],
+    config: VisualizerConfig,
+    store_path: str,
+    store_start: int,
+    first_frame: int,
+    start: int,
+    stop: int
+) -> List[Frame]:
+    """Render one contiguous frame range in a worker process
+
+    Args:
+        visualizer_cls: Visualizer class to instantiate
+        config: Visualization config
+        store_path: Feature store file covering first_frame up to stop
+        store_start: Absolute frame index of the store's frame 0
+        first_frame: Absolute index of the first frame replayed as history
+        start: Absolute index of the first frame to render
+        stop: Absolute index after the last frame to render
+
+    Returns:
+        Rendered frames from start up to stop
+    """
+    features = _open_store(store_path).window(first_frame - store_start, stop - store_start)
+    visualizer = visualizer_cls(config)
+    offset = start - first_frame
+    visualizer.seek(start, [features.frame(i) for i in range(offset)])
+    return [
+        visualizer.render_frame(features.frame(i))
+        for i in range(offset, len(features))
+    ]
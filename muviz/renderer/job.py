@@ -0,0 +1,131 @@
+"""Rendering one audio file into a video"""
+
+from typing import Callable, Optional
+
+from muviz.audio.analyzer import AudioAnalyzer
+from muviz.audio.cache import FeatureCache, hash_file
+from muviz.config.settings import VisualizerConfig
+from muviz.renderer.checkpoint import (
+    RenderCheckpoint, checkpoint_segment_frames, render_fingerprint, render_resumable
+)
+from muviz.renderer.frame_generator import FrameGenerator
+from muviz.renderer.video_writer import VideoWriter
+from muviz.visualizer.base import BaseVisualizer
+
+
+def create_visualizer(config: VisualizerConfig) -> BaseVisualizer:
+    """Instantiate the visualizer selected by ``config.style``
+
+    Args:
+        config: Visualization config
+
+    Returns:
+        Visualizer instance
+    """
+    from muviz.visualizer.geometric import GeometricVisualizer
+    from muviz.visualizer.particle import ParticleVisualizer
+    from muviz.visualizer.abstract import AbstractVisualizer
+
+    if config.style == "geometric":
+        return GeometricVisualizer(config)
+    elif config.style == "particle":
+        return ParticleVisualizer(config)
+    return AbstractVisualizer(config)
+
+
+def render_video(
+    input_file: str,
+    output: str,
+    config: VisualizerConfig,
+    duration: Optional[float] = None,
+    stream: bool = False,
+    cache: Optional[FeatureCache] = None,
+    work_dir: Optional[str] = None,
+    echo: Optional[Callable[..., None]] = None,
+    start: float = 0.0
+) -> int:
+    """Analyze an audio file and write its visualization video
+
+    With a start time or duration only that window of the track is
+    decoded and analyzed, plus the few frames before it the visualizer
+    warms up on and the samples the last frame's FFT window reaches
+    into, so the frames match the same frames of a full render.
+
+    Args:
+        input_file: Path to audio file
+        output: Output video file path
+        config: Visualization config; its sample_rate is updated
+        duration: Optional duration limit in seconds, from start
+        stream: Decode and analyze the audio block by block
+        cache: Analysis cache, or None to always decode and analyze
+        work_dir: Checkpoint directory for a resumable render, or None
+        echo: Progress message callback taking ``(message, err=False)``
+            like ``click.echo``; messages are dropped without one
+        start: Seconds into the track where the video starts
+
+    Returns:
+        Number of frames in the video
+    """
+    if echo is None:
+        def echo(message, err=False):
+            pass
+
+    visualizer = create_visualizer(config)
+    analyzer = AudioAnalyzer(cache=cache)
+
+    # Frame indices stay absolute, counted from the start of the track
+    start_frame = int(round(start * config.fps))
+    stop_frame = None
+    if duration is not None:
+        stop_frame = start_frame + int(duration * config.fps)
+    offset, window = 0.0, duration
+    if start_frame > 0:
+        offset, window = analyzer.analysis_window(
+            config.fps,
+            max(0, start_frame - type(visualizer).warmup_frames),
+            stop_frame
+        )
+
+    # Analyze audio
+    if stream:
+        try:
+            analyzer.open_stream(input_file, window, offset)
+        except RuntimeError as e:
+            echo(f"Warning: {e}; decoding the whole file instead", err=True)
+            stream = False
+    if not stream:
+        analyzer.load_audio(input_file, window, offset)
+
+    # Update config with audio sample rate
+    config.sample_rate = analyzer.sample_rate
+
+    # Frames are rendered lazily while the writer encodes them
+    echo("Generating and writing video frames...")
+    writer = VideoWriter(config)
+    # Reuse as many frame buffers as the writer holds at once, plus the
+    # one being drawn; frames rendered in workers arrive as new arrays
+    pool_frames = 0
+    if config.workers <= 1:
+        segment_frames = checkpoint_segment_frames(config) if work_dir else None
+        pool_frames = writer.frames_in_flight(segment_frames) + 1
+    frame_generator = FrameGenerator(
+        analyzer, visualizer, config, start_frame, stop_frame, pool_frames
+    )
+    writer.frame_pool = frame_generator.frame_pool
+    # The analysis audio is mono and resampled, so mux the source's own
+    audio = input_file
+    audio_start = start_frame / config.fps
+    if work_dir:
+        fingerprint = render_fingerprint(config, hash_file(input_file), duration, start)
+        checkpoint = RenderCheckpoint(work_dir, fingerprint)
+        if checkpoint.frames_done:
+            echo(f"Resuming after {checkpoint.frames_done} finished frames")
+        render_resumable(frame_generator, writer, audio, output, checkpoint, audio_start)
+        checkpoint.clear()
+    else:
+        writer.write_video(
+            frame_generator.iter_frames(), audio, output, audio_start,
+            frame_generator.num_frames / config.fps
+        )
+
+    return frame_generator.num_frames
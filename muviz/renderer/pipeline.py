@@ -0,0 +1,87 @@
+"""Bounded queues connecting the stages of a render"""
+
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Seconds between checks whether the consumer has gone away
+_POLL_SECONDS = 0.1
+
+
+class _Failure:
+    """Exception raised by a producer, passed on to the consumer"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+# Marks the end of the produced items
+_DONE = object()
+
+
+def prefetch(items: Iterable[T], depth: int, name: str = "muviz-stage") -> Iterator[T]:
+    """Produce items in a background thread, at most depth ahead of the consumer
+
+    The producing stage (e.g. analysis or rendering) runs concurrently
+    with the consuming one (rendering or encoding), so a pipeline of
+    stages runs about as fast as its slowest stage instead of the sum of
+    all of them. The bounded queue blocks the producer once it is depth
+    items ahead, which keeps memory use flat.
+
+    Exceptions of the producer are raised in the consumer. When the
+    consumer stops early the producer stops at its next item and its
+    iterator is closed in the background thread.
+
+    Args:
+        items: Iterable consumed in the background thread
+        depth: Queue size; 0 or less iterates items in the caller's thread
+        name: Thread name
+
+    Yields:
+        Items in order
+    """
+    if depth <= 0:
+        yield from items
+        return
+
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+            else:
+                put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
@@ -1,87 +1,635 @@
 """Video writing module"""
 
+import importlib.util
+import itertools
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
 import numpy as np
-from typing import List
-from PIL import Image
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Tuple, Union
 
-try:
-    from moviepy import ImageSequenceClip, AudioFileClip
-    MOVIEPY_AVAILABLE = True
-except ImportError:
-    MOVIEPY_AVAILABLE = False
+from muviz.config.settings import VisualizerConfig
+from muviz.profiling import profiler
+from muviz.renderer.pipeline import prefetch
+from muviz.visualizer.base import FRAME_PIXEL_FORMAT, Frame, FramePool, as_frame
 
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
+# Audio codecs an MP4/MOV output can carry as they are
+MP4_AUDIO_CODECS = {"aac", "mp3", "alac"}
 
-from muviz.config.settings import VisualizerConfig
+# Containers for which MP4_AUDIO_CODECS applies
+MP4_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+
+
+def module_available(name: str) -> bool:
+    """Check whether a module can be imported, without importing it
+
+    The moviepy and cv2 backends take long to import, so they are only
+    imported once selected.
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Locate an ffmpeg executable
+
+    Honours ``FFMPEG_BINARY``, then ``PATH``, then the binary bundled with
+    imageio-ffmpeg (installed alongside moviepy).
+
+    Returns:
+        Path to ffmpeg, or None if none was found
+    """
+    binary = os.environ.get("FFMPEG_BINARY")
+    if binary and binary != "ffmpeg-imageio":
+        return shutil.which(binary) or (binary if os.path.isfile(binary) else None)
+
+    binary = shutil.which("ffmpeg")
+    if binary:
+        return binary
+
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+
+@lru_cache(maxsize=16)
+def probe_audio_codec(path: str) -> Optional[str]:
+    """Get the codec name of the first audio stream of a media file
+
+    Returns:
+        Codec name as printed by ffmpeg (e.g. ``aac``, ``mp3``), or None if
+        it cannot be determined
+    """
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        return None
+    # ffmpeg without an output prints the stream summary and exits non-zero
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-i", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace"
+    )
+    match = re.search(r"Stream #\S+.*?: Audio: (\w+)", result.stderr)
+    return match.group(1) if match else None
+
+
+def audio_codec_args(path: str, output_path: str, audio_start: float = 0.0) -> List[str]:
+    """ffmpeg output arguments muxing the audio of a source file
+
+    The audio stream is copied as is when the output container can carry
+    it and no start is cut off, so it is neither decoded nor re-encoded.
+    Otherwise it is encoded once, straight from the source.
+
+    Args:
+        path: Source audio file
+        output_path: Output video file path
+        audio_start: Seconds into the source where the video starts
+
+    Returns:
+        Codec arguments for the audio stream
+    """
+    # Copied packets can only be cut at packet boundaries
+    if (audio_start <= 0
+            and os.path.splitext(output_path)[1].lower() in MP4_EXTENSIONS
+            and probe_audio_codec(path) in MP4_AUDIO_CODECS):
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", "192k"]
 
 
 class VideoWriter:
-    """Writes video files from frames"""
+    """Writes video files from frames
 
-    def __init__(self, config: VisualizerConfig):
+    Frames from ``frame_pool`` are released back to it as soon as they
+    have been handed to the encoder.
+    """
+
+    def __init__(self, config: VisualizerConfig, frame_pool: Optional[FramePool] = None):
         self.config = config
+        self.frame_pool = frame_pool
+
+    def release_frame(self, frame: Frame):
+        """Return an encoded frame to the frame pool, if any"""
+        if self.frame_pool is not None:
+            self.frame_pool.release(frame)
+
+    def frames_in_flight(self, segment_frames: Optional[int] = None) -> int:
+        """Get the most frames the writer holds on to at once
+
+        Args:
+            segment_frames: Frames per segment when writing segments with
+                ``write_segment`` or, for more than one encoder worker,
+                ``encode_segment``; by default as ``write_video`` does
+
+        Returns:
+            Number of frames taken from the input but not yet released
+        """
+        if segment_frames is not None:
+            if self.config.encoder_workers <= 1:
+                # write_segment pipes each frame as it arrives
+                return 1
+            # Segments being encoded plus the one being collected
+            return (self.config.encoder_workers + 1) * segment_frames
+
+        # write_video also holds the frames queued for the encoder and
+        # the one its producer is waiting to queue
+        queue_frames = self.config.encode_queue_frames
+        queued = queue_frames + 1 if queue_frames > 0 else 0
+        if self._select_backend() != "ffmpeg" or self.config.encoder_workers <= 1:
+            return 1 + queued
+        segment_frames = self.config.encoder_segment_frames or self.config.fps
+        return (self.config.encoder_workers + 1) * segment_frames + queued
 
-    def write_video(self, frames: List[Image.Image], audio: np.ndarray, output_path: str):
+    def write_video(
+        self,
+        frames: Iterable[Frame],
+        audio: Union[np.ndarray, str, None],
+        output_path: str,
+        audio_start: float = 0.0,
+        duration: Optional[float] = None
+    ):
         """Write frames to video file with audio
 
+        Frames are consumed incrementally, so a generator such as
+        ``FrameGenerator.iter_frames()`` is encoded without ever holding
+        the whole video in memory. The frames are produced in a background
+        thread, up to ``config.encode_queue_frames`` ahead, while this
+        thread feeds the encoder.
+
         Args:
-            frames: List of PIL Image frames
-            audio: Audio array
+            frames: Iterable of frame arrays; PIL Images and RGB arrays are
+                converted, at the cost of a copy each
+            audio: Path of a file whose audio stream is muxed as is where
+                possible and trimmed to the video, or a mono audio array at
+                ``config.sample_rate``
             output_path: Output video file path
+            audio_start: Seconds into an audio file where the video starts
+            duration: Length of the video in seconds, which an audio file
+                is cut to; without it the audio ends only about with the
+                video
         """
-        if not frames:
+        frames = iter(frames)
+        first = next(frames, None)
+        if first is None:
             raise ValueError("No frames to write")
+        frames = prefetch(
+            itertools.chain([first], frames),
+            self.config.encode_queue_frames,
+            name="muviz-render"
+        )
 
-        if MOVIEPY_AVAILABLE:
-            self._write_with_moviepy(frames, audio, output_path)
-        elif CV2_AVAILABLE:
-            self._write_with_cv2(frames, output_path)
+        backend = self._select_backend()
+        if backend == "ffmpeg":
+            self._write_with_ffmpeg(frames, audio, output_path, audio_start, duration)
+        elif backend == "moviepy":
+            self._write_with_moviepy(frames, audio, output_path, audio_start, duration)
         else:
-            raise RuntimeError("Neither moviepy nor opencv-python available")
+            self._write_with_cv2(frames, output_path)
 
-    def _write_with_moviepy(
+    def _select_backend(self) -> str:
+        """Resolve the configured backend to one that is available"""
+        backend = self.config.backend
+        available = {
+            # Audio is passed on an inherited pipe fd, which needs POSIX
+            "ffmpeg": os.name == "posix" and find_ffmpeg() is not None,
+            "moviepy": module_available("moviepy"),
+            "cv2": module_available("cv2"),
+        }
+
+        if backend == "auto":
+            for name in ("ffmpeg", "moviepy", "cv2"):
+                if available[name]:
+                    return name
+            raise RuntimeError("Neither ffmpeg, moviepy nor opencv-python available")
+
+        if backend not in available:
+            raise ValueError(f"Unknown video backend: {backend}")
+        if not available[backend]:
+            raise RuntimeError(f"Video backend '{backend}' is not available")
+        return backend
+
+    def _write_with_ffmpeg(
         self,
-        frames: List[Image.Image],
-        audio: np.ndarray,
-        output_path: str
+        frames: Iterable[Frame],
+        audio: Union[np.ndarray, str, None],
+        output_path: str,
+        audio_start: float = 0.0,
+        duration: Optional[float] = None
     ):
-        """Write video using MoviePy"""
-        # Convert frames to numpy arrays
-        frame_arrays = [np.array(frame) for frame in frames]
+        """Write video by piping raw frames into an ffmpeg process
 
-        # Convert RGB to BGR for moviepy
-        frame_arrays = [frame[:, :, ::-1] for frame in frame_arrays]
+        ffmpeg encodes while frames are still being rendered. An audio
+        file is read by ffmpeg itself and an audio array is fed as float32
+        PCM through a second pipe, so nothing is written to disk besides
+        the output file.
 
-        # Create video clip
-        clip = ImageSequenceClip(frame_arrays, fps=self.config.fps)
+        With ``config.encoder_workers`` above 1 the video is encoded in
+        segments by that many concurrent encoders instead.
+        """
+        if self.config.encoder_workers > 1:
+            self._write_with_ffmpeg_segments(frames, audio, output_path, audio_start)
+            return
 
-        # Add audio if available
-        import tempfile
-        import soundfile as sf
+        proc, audio_thread = self._open_ffmpeg(
+            self._raw_video_args(), audio, self._encoder_args(), output_path, audio_start,
+            duration
+        )
+        self._pipe_frames(proc, frames, self.release_frame)
+        with profiler.span("mux"):
+            self._close_ffmpeg(proc, audio_thread)
+
+    def _write_with_ffmpeg_segments(
+        self,
+        frames: Iterable[Frame],
+        audio: Union[np.ndarray, str, None],
+        output_path: str,
+        audio_start: float = 0.0
+    ):
+        """Encode consecutive segments concurrently, then join them losslessly
+
+        Every segment is encoded by its own ffmpeg process and starts with
+        an IDR frame, so segment boundaries are GOP boundaries and the
+        concat demuxer can join the segments with stream copy. Audio is
+        muxed once while joining. Frames of up to ``encoder_workers``
+        segments are buffered while their encoders catch up.
+        """
+        workers = self.config.encoder_workers
+        segment_frames = self.config.encoder_segment_frames or self.config.fps
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        work_dir = tempfile.mkdtemp(prefix=".muviz-segments-", dir=output_dir)
+
+        segment_paths = []
+        num_frames = 0
+        encoders = deque()
+        try:
+            frames = iter(frames)
+            while True:
+                segment = list(itertools.islice(frames, segment_frames))
+                if not segment:
+                    break
+
+                # Wait for the oldest encoder before starting another
+                if len(encoders) >= workers:
+                    with profiler.span("encode.wait"):
+                        encoders.popleft().finish()
+
+                path = os.path.join(work_dir, f"segment-{len(segment_paths):06d}.mp4")
+                segment_paths.append(path)
+                num_frames += len(segment)
+                encoders.append(self.encode_segment(segment, path))
 
-        if len(audio) > 0:
-            # Save audio to temp file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                tmp_path = tmp.name
+            with profiler.span("encode.wait"):
+                while encoders:
+                    encoders.popleft().finish()
 
-            sf.write(tmp_path, audio, self.config.sample_rate)
-            audio_clip = AudioFileClip(tmp_path)
-            clip = clip.with_audio(audio_clip)
+            with profiler.span("mux"):
+                self.concat_segments(
+                    segment_paths, audio, output_path, audio_start, num_frames / self.config.fps
+                )
+        finally:
+            while encoders:
+                encoders.popleft().abort()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def encode_segment(self, frames: List[Frame], path: str) -> "SegmentEncoder":
+        """Start encoding frames into a standalone video segment
+
+        Segments written with the same config can be joined losslessly
+        with ``concat_segments``. The cores are split between
+        ``encoder_workers`` concurrent encoders unless threads were set.
+
+        Args:
+            frames: Frames of the segment
+            path: Output segment file path (.mp4)
+
+        Returns:
+            SegmentEncoder encoding in the background
+
+        Raises:
+            RuntimeError: If ffmpeg is not available
+        """
+        if find_ffmpeg() is None:
+            raise RuntimeError("Encoding video segments requires ffmpeg")
+        return SegmentEncoder(self, frames, path, self._segment_threads())
 
-        # Write video
-        clip.write_videofile(
+    def write_segment(self, frames: Iterable[Frame], path: str) -> int:
+        """Encode frames into a standalone video segment as they arrive
+
+        Like ``encode_segment``, but frames are piped into ffmpeg in the
+        caller's thread and released right away instead of being held
+        until the segment is complete.
+
+        Args:
+            frames: Frames of the segment
+            path: Output segment file path (.mp4)
+
+        Returns:
+            Number of frames written
+
+        Raises:
+            RuntimeError: If ffmpeg is not available or failed
+        """
+        if find_ffmpeg() is None:
+            raise RuntimeError("Encoding video segments requires ffmpeg")
+        written = 0
+
+        def counted():
+            nonlocal written
+            for frame in frames:
+                written += 1
+                yield frame
+
+        proc, _ = self._open_ffmpeg(
+            self._raw_video_args(), None, self._encoder_args(self._segment_threads()), path
+        )
+        self._pipe_frames(proc, counted(), self.release_frame)
+        self._close_ffmpeg(proc)
+        return written
+
+    def _segment_threads(self) -> int:
+        """Encoder threads per segment, splitting the cores between encoders"""
+        return self.config.encoder_threads or max(
+            1, (os.cpu_count() or 1) // self.config.encoder_workers
+        )
+
+    def concat_segments(
+        self,
+        segment_paths: List[str],
+        audio: Union[np.ndarray, str, None],
+        output_path: str,
+        audio_start: float = 0.0,
+        duration: Optional[float] = None
+    ):
+        """Join encoded segments with stream copy and mux the audio
+
+        Args:
+            segment_paths: Segment files in order
+            audio: Mono audio array, audio file path or None
+            output_path: Output video file path
+            audio_start: Seconds into an audio file where the video starts
+            duration: Length of the video in seconds, which an audio file
+                is cut to
+        """
+        if not segment_paths:
+            raise ValueError("No frames to write")
+
+        # The concat demuxer reads the segment list from a file
+        list_path = os.path.join(os.path.dirname(os.path.abspath(segment_paths[0])), "concat.txt")
+        try:
+            with open(list_path, "w", encoding="utf-8") as f:
+                for path in segment_paths:
+                    escaped = os.path.abspath(path).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+
+            proc, audio_thread = self._open_ffmpeg(
+                ["-f", "concat", "-safe", "0", "-i", list_path],
+                audio,
+                ["-c:v", "copy"],
+                output_path,
+                audio_start,
+                duration
+            )
+            self._close_ffmpeg(proc, audio_thread)
+        finally:
+            os.remove(list_path)
+
+    def _raw_video_args(self) -> List[str]:
+        """ffmpeg input arguments for raw frames on stdin"""
+        return [
+            "-f", "rawvideo",
+            "-pix_fmt", FRAME_PIXEL_FORMAT,
+            "-s", f"{self.config.width}x{self.config.height}",
+            "-r", str(self.config.fps),
+            "-i", "pipe:0",
+        ]
+
+    def _encoder_args(self, threads: Optional[int] = None) -> List[str]:
+        """ffmpeg output arguments for the configured libx264 encoder"""
+        args = [
+            "-c:v", "libx264",
+            "-preset", self.config.encoder_preset,
+            "-crf", str(self.config.encoder_crf),
+            "-pix_fmt", "yuv420p",
+        ]
+        threads = threads or self.config.encoder_threads
+        if threads > 0:
+            args += ["-threads", str(threads)]
+        return args
+
+    def _open_ffmpeg(
+        self,
+        input_args: List[str],
+        audio: Union[np.ndarray, str, None],
+        output_args: List[str],
+        output_path: str,
+        audio_start: float = 0.0,
+        duration: Optional[float] = None
+    ) -> Tuple[subprocess.Popen, Optional[threading.Thread]]:
+        """Start ffmpeg with a video input and optional audio
+
+        Args:
+            input_args: Arguments declaring the video input
+            audio: Mono audio array, audio file path or None
+            output_args: Video output arguments
+            output_path: Output file path
+            audio_start: Seconds into an audio file where the video starts
+            duration: Seconds of an audio file to read, the video's length
+
+        Returns:
+            Tuple of the ffmpeg process, with stdin open, and the thread
+            feeding it audio, if any
+        """
+        cmd = [find_ffmpeg(), "-y", "-loglevel", "error", "-nostats"] + input_args
+
+        audio_read_fd = audio_write_fd = None
+        has_audio = isinstance(audio, np.ndarray) and len(audio) > 0
+        if isinstance(audio, str):
+            if audio_start > 0:
+                # Input seeking, so the skipped audio is not decoded
+                cmd += ["-ss", f"{audio_start:.6f}"]
+            if duration is not None:
+                # -shortest alone lets the audio run on for a fraction of
+                # a second past the last frame
+                cmd += ["-t", f"{duration:.6f}"]
+            cmd += [
+                "-i", audio,
+                "-map", "0:v", "-map", "1:a:0",
+                *audio_codec_args(audio, output_path, audio_start),
+                "-shortest",
+            ]
+        elif has_audio:
+            # Extra pipe for the audio stream alongside video on stdin
+            audio_read_fd, audio_write_fd = os.pipe()
+            cmd += [
+                "-f", "f32le",
+                "-ar", str(self.config.sample_rate),
+                "-ac", "1",
+                "-i", f"pipe:{audio_read_fd}",
+                "-map", "0:v", "-map", "1:a",
+                "-c:a", "aac",
+            ]
+        cmd += output_args + [output_path]
+
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            pass_fds=(audio_read_fd,) if has_audio else ()
+        )
+
+        audio_thread = None
+        if has_audio:
+            os.close(audio_read_fd)
+            audio_thread = threading.Thread(
+                target=self._feed_audio,
+                args=(audio_write_fd, audio),
+                daemon=True
+            )
+            audio_thread.start()
+        return proc, audio_thread
+
+    @staticmethod
+    def _pipe_frames(
+        proc: subprocess.Popen,
+        frames: Iterable[Frame],
+        release: Optional[Callable[[Frame], None]] = None
+    ):
+        """Write frames into ffmpeg's stdin straight from their memory
+
+        Each frame is passed to release, if given, once it is written.
+        """
+        try:
+            for frame in frames:
+                with profiler.span("convert"):
+                    data = as_frame(frame)
+                with profiler.span("encode"):
+                    proc.stdin.write(data)
+                if release is not None:
+                    release(frame)
+        except BrokenPipeError:
+            # ffmpeg exited early; its stderr explains why
+            pass
+        except BaseException:
+            proc.kill()
+            proc.stdin.close()
+            proc.wait()
+            raise
+
+    @staticmethod
+    def _close_ffmpeg(proc: subprocess.Popen, audio_thread: Optional[threading.Thread] = None):
+        """Close ffmpeg's stdin, wait for it to finish and check its status
+
+        Raises:
+            RuntimeError: If ffmpeg failed
+        """
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        # ffmpeg flushes the encoder and muxes once stdin is closed
+        if audio_thread is not None:
+            audio_thread.join()
+        stderr = proc.stderr.read()
+        proc.wait()
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+
+    @staticmethod
+    def _feed_audio(fd: int, audio: np.ndarray):
+        """Write mono float32 PCM into a pipe and close it"""
+        with os.fdopen(fd, "wb") as pipe:
+            try:
+                pipe.write(np.ascontiguousarray(audio, dtype=np.float32))
+            except BrokenPipeError:
+                pass
+
+    def _write_with_moviepy(
+        self,
+        frames: Iterable[Frame],
+        audio: Union[np.ndarray, str, None],
+        output_path: str,
+        audio_start: float = 0.0,
+        duration: Optional[float] = None
+    ):
+        """Write video using MoviePy's streaming ffmpeg writer"""
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        # Add audio if available
+        audio_path = None
+        audio_codec = None
+        tmp_dir = None
+        ffmpeg_params = ["-crf", str(self.config.encoder_crf)]
+        if isinstance(audio, str):
+            audio_path = audio
+            codec_args = audio_codec_args(audio, output_path, audio_start)
+            audio_codec = codec_args[1]
+            # moviepy sets the audio codec itself; keep the bitrate
+            ffmpeg_params += codec_args[2:]
+            if audio_start > 0:
+                # moviepy passes no input options, so trim the audio stream
+                ffmpeg_params += ["-af", f"atrim=start={audio_start:.6f},asetpts=PTS-STARTPTS"]
+            if duration is not None:
+                # Cut the output, as there is no input option for the audio
+                ffmpeg_params += ["-t", f"{duration:.6f}"]
+            ffmpeg_params.append("-shortest")
+        elif audio is not None and len(audio) > 0:
+            # moviepy only reads audio from a file
+            import soundfile as sf
+
+            tmp_dir = tempfile.mkdtemp(prefix=".muviz-audio-")
+            audio_path = os.path.join(tmp_dir, "audio.wav")
+            audio_codec = "aac"
+            with profiler.span("audio.write"):
+                sf.write(audio_path, audio, self.config.sample_rate)
+
+        writer = FFMPEG_VideoWriter(
             output_path,
+            (self.config.width, self.config.height),
+            self.config.fps,
             codec="libx264",
-            audio_codec="aac",
-            logger=None
+            audiofile=audio_path,
+            audio_codec=audio_codec,
+            preset=self.config.encoder_preset,
+            threads=self.config.encoder_threads or None,
+            ffmpeg_params=ffmpeg_params,
+            # Reads 4-byte rgba pixels; the X byte of a frame is always 255
+            with_mask=True
         )
 
-    def _write_with_cv2(self, frames: List[Image.Image], output_path: str):
+        try:
+            for frame in frames:
+                with profiler.span("convert"):
+                    data = as_frame(frame)
+                with profiler.span("encode"):
+                    try:
+                        # write_frame would copy the frame with tobytes()
+                        writer.proc.stdin.write(data)
+                    except OSError:
+                        # Let moviepy collect ffmpeg's error message
+                        writer.write_frame(data)
+                self.release_frame(frame)
+        finally:
+            with profiler.span("mux"):
+                writer.close()
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _write_with_cv2(self, frames: Iterable[Frame], output_path: str):
         """Write video using OpenCV"""
+        import cv2
+
         # Get video writer
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         writer = cv2.VideoWriter(
@@ -94,14 +642,53 @@ class VideoWriter:
         if not writer.isOpened():
             raise RuntimeError("Failed to open video writer")
 
+        # OpenCV takes BGR frames; converted into one reused buffer
+        frame_bgr = np.empty((self.config.height, self.config.width, 3), dtype=np.uint8)
         try:
             for frame in frames:
-                # Convert RGB to BGR
-                frame_bgr = cv2.cvtColor(np.array(frame), cv2.COLOR_RGB2BGR)
-                writer.write(frame_bgr)
+                with profiler.span("convert"):
+                    cv2.cvtColor(as_frame(frame), cv2.COLOR_RGBA2BGR, dst=frame_bgr)
+                self.release_frame(frame)
+                with profiler.span("encode"):
+                    writer.write(frame_bgr)
         finally:
-            writer.release()
+            with profiler.span("mux"):
+                writer.release()
 
         # Note: Audio not supported with OpenCV alone
-        if len(frames) > 0:
-            print("Warning: Audio not included (moviepy not available)")
+        print("Warning: Audio not included (the cv2 backend cannot mux audio)")
+
+
+class SegmentEncoder:
+    """Encodes one segment of frames in a background ffmpeg process"""
+
+    def __init__(self, writer: VideoWriter, frames: List[Frame], path: str, threads: int):
+        self.proc, _ = writer._open_ffmpeg(
+            writer._raw_video_args(), None, writer._encoder_args(threads), path
+        )
+        self.error = None
+        self.release = writer.release_frame
+        self.thread = threading.Thread(target=self._run, args=(frames,), daemon=True)
+        self.thread.start()
+
+    def _run(self, frames: List[Frame]):
+        try:
+            VideoWriter._pipe_frames(self.proc, frames, self.release)
+            VideoWriter._close_ffmpeg(self.proc)
+        except BaseException as e:
+            self.error = e
+
+    def finish(self):
+        """Wait for the segment to be encoded
+
+        Raises:
+            RuntimeError: If encoding failed
+        """
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self):
+        """Stop encoding and wait for ffmpeg to exit"""
+        self.proc.kill()
+        self.thread.join()
@@ -1,45 +1,47 @@
 """Abstract art visualization"""
 
 import math
-import random
+from typing import Dict
+
 import numpy as np
-from PIL import Image, ImageDraw
+from PIL import ImageDraw
 
-from muviz.visualizer.base import BaseVisualizer
+from muviz.profiling import profiler
+from muviz.visualizer.base import BaseVisualizer, Frame
 
 
 class AbstractVisualizer(BaseVisualizer):
     """Abstract art patterns that react to audio"""
 
+    # Waveforms of the last max_history frames are drawn
+    warmup_frames = 100
+
     def __init__(self, config):
         super().__init__(config)
-        self.waveform_history = []
-        self.max_history = 100
+        self.max_history = self.warmup_frames
+        self.reset()
 
-    def render_frame(self, audio_data: dict) -> Image.Image:
+    def render_frame(self, audio_data: dict) -> Frame:
         """Render abstract visualization
 
         Args:
             audio_data: Dictionary with 'rms', 'frequency_bands', 'spectrum', 'waveform'
 
         Returns:
-            PIL Image
+            Frame array
         """
-        # Create background
-        img = Image.new("RGB", (self.config.width, self.config.height))
+        # Start from the cached background
+        frame, img = self.new_canvas()
         draw = ImageDraw.Draw(img)
 
-        # Fill background
-        bg = self.theme["background"]
-        draw.rectangle([0, 0, self.config.width, self.config.height], fill=bg)
-
         # Get audio features
         rms = audio_data.get("rms", 0.0)
         low, mid, high = audio_data.get("frequency_bands", (0.5, 0.5, 0.5))
-        waveform = audio_data.get("waveform", np.zeros(1024))
 
-        # Draw flowing waveform
-        self._draw_flowing_waveform(draw, waveform, rms)
+        # Record waveform history and draw flowing waveform
+        self.update(audio_data)
+        with profiler.span("render.waveform"):
+            self._draw_flowing_waveform(draw, rms)
 
         # Draw frequency bars
         self._draw_frequency_bars(draw, audio_data.get("spectrum", np.zeros(1024)), mid)
@@ -48,38 +50,86 @@ class AbstractVisualizer(BaseVisualizer):
         self._draw_circular_aura(draw, low, mid, high)
 
         self.advance_frame()
-        return img
+        return frame
 
-    def _draw_flowing_waveform(self, draw: ImageDraw, waveform: np.ndarray, rms: float):
-        """Draw flowing waveform across screen"""
+    def update(self, audio_data: dict):
+        """Store the current waveform in history"""
+        waveform = audio_data.get("waveform", np.zeros(1024))
         if len(waveform) < 2:
             return
 
-        # Store waveform in history
-        self.waveform_history.append(waveform.copy())
-        if len(self.waveform_history) > self.max_history:
-            self.waveform_history.pop(0)
+        # Ring buffer of the last max_history waveforms, one per row
+        if self._history is None or self._history.shape[1] != len(waveform):
+            self._history = np.zeros((self.max_history, len(waveform)), dtype=np.float32)
+            self._history_count = 0
+            self._history_next = 0
+
+        self._history[self._history_next] = waveform
+        self._history_next = (self._history_next + 1) % self.max_history
+        self._history_count = min(self._history_count + 1, self.max_history)
+
+    def reset(self):
+        """Clear waveform history"""
+        super().reset()
+        self._history = None
+        self._history_count = 0
+        self._history_next = 0
+
+    def state_dict(self) -> Dict[str, np.ndarray]:
+        """Snapshot the waveform history"""
+        state = super().state_dict()
+        state["waveform_history"] = self.waveform_history.copy()
+        return state
+
+    def load_state_dict(self, state: Dict[str, np.ndarray]):
+        """Restore the waveform history"""
+        super().load_state_dict(state)
+        history = np.asarray(state["waveform_history"], dtype=np.float32)[-self.max_history:]
+        if history.size == 0:
+            return
+        self._history = np.zeros((self.max_history, history.shape[1]), dtype=np.float32)
+        self._history[:len(history)] = history
+        self._history_count = len(history)
+        self._history_next = len(history) % self.max_history
+
+    @property
+    def waveform_history(self) -> np.ndarray:
+        """Stored waveforms as a (count, samples) array, oldest first"""
+        if self._history is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        first = self._history_next - self._history_count
+        rows = np.arange(first, self._history_next) % self.max_history
+        return self._history[rows]
+
+    def _draw_flowing_waveform(self, draw: ImageDraw, rms: float):
+        """Draw flowing waveform across screen"""
+        history = self.waveform_history
+        count, length = history.shape
+        if count == 0:
+            return
 
-        # Draw multiple waveforms from history
-        for i, wf in enumerate(self.waveform_history):
-            alpha = (i + 1) / len(self.waveform_history)
-            y_offset = self.config.height // 2
-            scale = self.config.height // 4
+        y_offset = self.config.height // 2
+        scale = self.config.height // 4
 
-            points = []
-            step = len(wf) // self.config.width
-            if step < 1:
-                step = 1
+        # Sample positions shared by every waveform in history
+        step = max(1, length // self.config.width)
+        xs = np.arange(0, min(length, self.config.width), step)
+        if len(xs) < 2:
+            return
+        idx = xs * length // self.config.width
 
-            for x in range(0, min(len(wf), self.config.width), step):
-                idx = x * len(wf) // self.config.width
-                y = y_offset + int(wf[idx] * scale * (0.5 + rms))
-                points.append((x, y))
+        # Point coordinates for all polylines at once, (count, points, 2)
+        ys = y_offset + (history[:, idx] * scale * (0.5 + rms)).astype(np.int32)
+        points = np.empty((count, len(xs), 2), dtype=np.int32)
+        points[:, :, 0] = xs
+        points[:, :, 1] = ys
 
-            if len(points) > 1:
-                color = self.get_color("mid", alpha * rms)
-                color = tuple(int(c * alpha) for c in color)
-                draw.line(points, fill=color, width=2)
+        # Draw multiple waveforms from history, oldest first and faintest;
+        # one line at a time is turned into Python ints, not all of them
+        alphas = np.arange(1, count + 1) / count
+        colors = (self.get_colors("mid", alphas * rms) * alphas[:, None]).astype(np.int64)
+        for line, color in zip(points.reshape(count, -1), colors.tolist()):
+            draw.line(line.tolist(), fill=tuple(color), width=2)
 
     def _draw_frequency_bars(self, draw: ImageDraw, spectrum: np.ndarray, intensity: float):
         """Draw vertical frequency bars"""
@@ -96,6 +146,10 @@ class AbstractVisualizer(BaseVisualizer):
         if step < 1:
             step = 1
 
+        low_color, mid_color, high_color = map(tuple, self.get_colors(
+            ["low", "mid", "high"], [intensity] * 3
+        ).tolist())
+
         for i in range(num_bars):
             idx = i * step
             if idx >= len(spectrum_slice):
@@ -110,11 +164,11 @@ class AbstractVisualizer(BaseVisualizer):
 
             # Color based on position
             if i < num_bars // 3:
-                color = self.get_color("low", intensity)
+                color = low_color
             elif i < 2 * num_bars // 3:
-                color = self.get_color("mid", intensity)
+                color = mid_color
             else:
-                color = self.get_color("high", intensity)
+                color = high_color
 
             draw.rectangle(
                 [x + bar_spacing, y_top, x + bar_width - bar_spacing, self.config.height],
@@ -126,10 +180,12 @@ class AbstractVisualizer(BaseVisualizer):
         center_x = self.config.width // 2
         center_y = self.config.height // 2
 
-        # Multiple concentric rings
-        for i in range(5):
+        # Multiple concentric rings, fading outwards
+        num_rings = 5
+        ring_colors = self.get_colors("mid", mid * (1 - np.arange(num_rings) * 0.15)).tolist()
+        for i, color in enumerate(ring_colors):
             radius = 50 + i * 40 + int(mid * 30)
-            color = self.get_color("mid", mid * (1 - i * 0.15))
+            color = tuple(color)
 
             # Pulsing effect
             pulse = int(math.sin(self.frame_idx * 0.1 + i) * 5 * low)
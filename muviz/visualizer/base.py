@@ -1,40 +1,226 @@
 """Base visualizer class"""
 
+import threading
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import numpy as np
 from PIL import Image
 
 from muviz.config.settings import VisualizerConfig, get_theme_colors
+from muviz.profiling import profiler
+
+# A rendered frame: C-contiguous (height, width, 4) uint8 RGBX array, the
+# layout of PIL's RGBX mode and of ffmpeg's rgb0 pixel format, so frames
+# are drawn into and encoded from the same memory
+Frame = np.ndarray
+
+# Bytes per pixel of a frame
+FRAME_CHANNELS = 4
+
+# ffmpeg raw video pixel format of a frame
+FRAME_PIXEL_FORMAT = "rgb0"
+
+# Frequency bands in color lookup table order
+BANDS = ("low", "mid", "high")
+
+# Intensity levels per band in a color lookup table
+COLOR_LEVELS = 256
+
+# Color lookup table row of each band name
+_BAND_INDEX = {band: idx for idx, band in enumerate(BANDS)}
+
+
+@lru_cache(maxsize=None)
+def get_color_lut(theme_name: str) -> np.ndarray:
+    """Get the color lookup table of a theme
+
+    Entry ``[band, level]`` is the band's theme color scaled by
+    ``0.3 + 0.7 * intensity`` for ``intensity = level / (COLOR_LEVELS - 1)``.
+
+    Args:
+        theme_name: Theme name
+
+    Returns:
+        Read-only (3, COLOR_LEVELS, 3) uint8 array indexed by band, level, RGB
+    """
+    theme = get_theme_colors(theme_name)
+    base = np.array([theme[f"{band}_freq"] for band in BANDS], dtype=np.float64)
+    intensity = np.arange(COLOR_LEVELS) / (COLOR_LEVELS - 1)
+    lut = (base[:, None, :] * (0.3 + 0.7 * intensity)[None, :, None]).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+class FramePool:
+    """Fixed set of frame buffers reused from frame to frame
+
+    Buffers are allocated on first use, up to ``size``; after that
+    ``acquire`` hands out released buffers only and blocks while all of
+    them are in use, so a consumer that falls behind holds back rendering
+    instead of letting frames pile up. Consumers call ``release`` once a
+    frame has been encoded.
+    """
+
+    def __init__(self, height: int, width: int, size: int):
+        self.shape = (height, width, FRAME_CHANNELS)
+        self.size = max(1, size)
+        self._buffers: List[Frame] = []
+        self._free: List[Frame] = []
+        self._in_use = set()
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Frame:
+        """Get a free frame buffer, waiting for one if all are in use
+
+        Returns:
+            Frame array with undefined contents
+        """
+        with self._cond:
+            if not self._free and len(self._buffers) >= self.size:
+                with profiler.span("pool.wait"):
+                    self._cond.wait_for(lambda: self._free)
+
+            if self._free:
+                frame = self._free.pop()
+            else:
+                frame = np.empty(self.shape, dtype=np.uint8)
+                self._buffers.append(frame)
+            self._in_use.add(id(frame))
+            return frame
+
+    def release(self, frame: Frame):
+        """Return a buffer to the pool; frames not taken from it are ignored
+
+        Args:
+            frame: Frame that is no longer needed
+        """
+        with self._cond:
+            if id(frame) not in self._in_use:
+                return
+            self._in_use.discard(id(frame))
+            self._free.append(frame)
+            self._cond.notify()
 
 
 class BaseVisualizer(ABC):
     """Base class for all visualizers"""
 
+    # Number of preceding frames whose audio determines the state at a frame
+    warmup_frames = 0
+
     def __init__(self, config: VisualizerConfig):
         self.config = config
         self.theme = get_theme_colors(config.theme)
+        self.color_lut = get_color_lut(config.theme)
+        # Same table as tuples, so get_color returns without building one
+        self._color_tuples = [
+            [tuple(color) for color in band] for band in self.color_lut.tolist()
+        ]
         self.frame_idx = 0
+        # Frames are drawn into buffers from this pool when set
+        self.frame_pool: Optional[FramePool] = None
+        self._background = None
 
     @abstractmethod
-    def render_frame(self, audio_data: dict) -> Image.Image:
+    def render_frame(self, audio_data: dict) -> Frame:
         """Render a single frame
 
         Args:
             audio_data: Dictionary containing audio features
 
         Returns:
-            PIL Image
+            Frame array; ``new_frame`` and ``new_canvas`` start one
+        """
+        pass
+
+    def update(self, audio_data: dict):
+        """Advance state carried across frames without drawing
+
+        Called once per frame by ``render_frame`` and by ``seek`` when
+        warming up. Stateless visualizers do not need to override it.
+
+        Args:
+            audio_data: Dictionary containing audio features
         """
         pass
 
-    def create_background(self) -> np.ndarray:
+    def reset(self):
+        """Clear all state carried across frames"""
+        self.frame_idx = 0
+
+    def seek(self, frame_idx: int, history: Sequence[dict]):
+        """Jump to an arbitrary frame as if every earlier frame was rendered
+
+        Args:
+            frame_idx: Frame index the next ``render_frame`` call renders
+            history: Audio data of the frames before frame_idx, oldest
+                first; only the last ``warmup_frames`` entries are used
+        """
+        self.reset()
+        history = list(history[-self.warmup_frames:]) if self.warmup_frames else []
+        self.frame_idx = frame_idx - len(history)
+        for audio_data in history:
+            self.update(audio_data)
+            self.advance_frame()
+
+    def state_dict(self) -> Dict[str, np.ndarray]:
+        """Snapshot the state carried across frames
+
+        Visualizers with state beyond the frame index extend the snapshot.
+
+        Returns:
+            Dictionary of arrays that ``load_state_dict`` restores
+        """
+        return {"frame_idx": np.array(self.frame_idx)}
+
+    def load_state_dict(self, state: Dict[str, np.ndarray]):
+        """Restore a snapshot taken with ``state_dict``
+
+        Args:
+            state: Snapshot, e.g. as loaded from an ``.npz`` file
+        """
+        self.reset()
+        self.frame_idx = int(state["frame_idx"])
+
+    def create_background(self) -> Frame:
         """Create background array
 
         Returns:
-            Background array (height, width, 3)
+            Background frame array (height, width, 4)
+        """
+        frame = np.empty((self.config.height, self.config.width, FRAME_CHANNELS), dtype=np.uint8)
+        frame[:, :, :3] = self.theme["background"]
+        frame[:, :, 3] = 255
+        return frame
+
+    def new_frame(self) -> Frame:
+        """Start a frame array from the cached background
+
+        With a frame pool the background is copied into a pooled buffer,
+        which may wait for the consumer to release one.
+
+        Returns:
+            Writable copy of the background frame (height, width, 4)
+        """
+        if self._background is None:
+            self._background = self.create_background()
+        if self.frame_pool is None:
+            return self._background.copy()
+        frame = self.frame_pool.acquire()
+        np.copyto(frame, self._background)
+        return frame
+
+    def new_canvas(self) -> Tuple[Frame, Image.Image]:
+        """Start a frame from the cached background for drawing with PIL
+
+        Returns:
+            Tuple of a new frame array and an RGBX image sharing its
+            memory, so whatever is drawn on the image is in the frame
+            without a conversion or copy
         """
-        bg = self.theme["background"]
-        return np.full((self.config.height, self.config.width, 3), bg, dtype=np.uint8)
+        frame = self.new_frame()
+        return frame, frame_image(frame)
 
     def get_color(self, freq_band: str, intensity: float) -> tuple:
         """Get color based on frequency band and intensity
@@ -46,16 +232,99 @@ class BaseVisualizer(ABC):
         Returns:
             RGB color tuple
         """
-        if freq_band == "low":
-            base = self.theme["low_freq"]
-        elif freq_band == "mid":
-            base = self.theme["mid_freq"]
+        level = min(max(int(intensity * (COLOR_LEVELS - 1) + 0.5), 0), COLOR_LEVELS - 1)
+        return self._color_tuples[band_index(freq_band)][level]
+
+    def get_colors(
+        self,
+        freq_bands: Union[str, Sequence[str], np.ndarray],
+        intensities: Union[Sequence[float], np.ndarray]
+    ) -> np.ndarray:
+        """Get colors for many intensities at once
+
+        Args:
+            freq_bands: One band name for all intensities, or a band name
+                or band index (0 low, 1 mid, 2 high) per intensity
+            intensities: 0-1 intensity values
+
+        Returns:
+            (n, 3) uint8 array of RGB colors
+        """
+        levels = np.asarray(intensities, dtype=np.float64) * (COLOR_LEVELS - 1) + 0.5
+        levels = np.clip(levels.astype(np.int64), 0, COLOR_LEVELS - 1)
+        if isinstance(freq_bands, str):
+            bands = band_index(freq_bands)
+        elif isinstance(freq_bands, np.ndarray) and freq_bands.dtype.kind in "iu":
+            bands = freq_bands
         else:
-            base = self.theme["high_freq"]
+            bands = np.array([
+                band_index(band) if isinstance(band, str) else band for band in freq_bands
+            ], dtype=np.int64)
+        return self.color_lut[bands, levels]
+
+    def frame_rng(self, frame_idx: Optional[int] = None) -> np.random.Generator:
+        """Get the random generator of a frame
+
+        The stream depends only on ``config.seed`` and the frame index, so
+        frames render the same in any order, process or segment. Philox is
+        counter based: the seed is the key and the frame index sets the
+        highest counter word, so the streams of different frames never
+        overlap and creating one costs no seed hashing.
+
+        Args:
+            frame_idx: Frame index, by default the frame being rendered
 
-        # Apply intensity
-        return tuple(int(c * (0.3 + 0.7 * intensity)) for c in base)
+        Returns:
+            Generator for random visual elements of the frame
+        """
+        if frame_idx is None:
+            frame_idx = self.frame_idx
+        counter = [0, 0, 0, frame_idx]
+        return np.random.Generator(np.random.Philox(key=self.config.seed, counter=counter))
 
     def advance_frame(self):
         """Advance to next frame"""
         self.frame_idx += 1
+
+
+def frame_image(frame: Frame) -> Image.Image:
+    """Wrap a frame array in a writable PIL image sharing its memory
+
+    Args:
+        frame: C-contiguous (height, width, 4) uint8 array
+
+    Returns:
+        RGBX image drawing straight into frame
+    """
+    height, width = frame.shape[:2]
+    image = Image.frombuffer("RGBX", (width, height), frame, "raw", "RGBX", 0, 1)
+    # Mapped buffers are read-only by default, which would make PIL copy
+    # the pixels before the first drawing operation
+    image.readonly = 0
+    return image
+
+
+def as_frame(frame: Union[Frame, Image.Image]) -> Frame:
+    """Get a frame array from a PIL image or an RGB/RGBX array
+
+    Frames in the native layout are returned as they are, without a copy.
+
+    Args:
+        frame: Frame array, PIL image, or (height, width, 3) RGB array
+
+    Returns:
+        C-contiguous (height, width, 4) uint8 RGBX array
+    """
+    if isinstance(frame, Image.Image):
+        frame = np.asarray(frame.convert("RGBX"))
+    if frame.ndim == 3 and frame.shape[2] == 3:
+        rgbx = np.empty(frame.shape[:2] + (FRAME_CHANNELS,), dtype=np.uint8)
+        rgbx[:, :, :3] = frame
+        rgbx[:, :, 3] = 255
+        return rgbx
+    return np.ascontiguousarray(frame, dtype=np.uint8)
+
+
+def band_index(freq_band: str) -> int:
+    """Get the color lookup table row of a band, 'high' for unknown names"""
+    return _BAND_INDEX.get(freq_band, len(BANDS) - 1)
@@ -2,9 +2,10 @@
 
 import math
 import numpy as np
-from PIL import Image, ImageDraw
+from PIL import ImageDraw
 
-from muviz.visualizer.base import BaseVisualizer
+from muviz.profiling import profiler
+from muviz.visualizer.base import BaseVisualizer, Frame
 
 
 class GeometricVisualizer(BaseVisualizer):
@@ -16,38 +17,35 @@ class GeometricVisualizer(BaseVisualizer):
         self.center_y = config.height // 2
         self.max_radius = min(config.width, config.height) // 3
 
-    def render_frame(self, audio_data: dict) -> Image.Image:
+    def render_frame(self, audio_data: dict) -> Frame:
         """Render geometric visualization
 
         Args:
             audio_data: Dictionary with 'rms', 'frequency_bands', 'spectrum'
 
         Returns:
-            PIL Image
+            Frame array
         """
-        # Create background
-        img = Image.new("RGB", (self.config.width, self.config.height))
+        # Start from the cached background
+        frame, img = self.new_canvas()
         draw = ImageDraw.Draw(img)
 
-        # Fill background
-        bg = self.theme["background"]
-        draw.rectangle([0, 0, self.config.width, self.config.height], fill=bg)
-
         # Get audio features
         rms = audio_data.get("rms", 0.0)
         low, mid, high = audio_data.get("frequency_bands", (0.5, 0.5, 0.5))
 
-        # Draw concentric circles based on frequency bands
-        self._draw_circles(draw, low, mid, high, rms)
+        with profiler.span("render.shapes"):
+            # Draw concentric circles based on frequency bands
+            self._draw_circles(draw, low, mid, high, rms)
 
-        # Draw polygon in center
-        self._draw_polygon(draw, mid, rms)
+            # Draw polygon in center
+            self._draw_polygon(draw, mid, rms)
 
-        # Draw radiating lines
-        self._draw_radiating_lines(draw, high, rms)
+            # Draw radiating lines
+            self._draw_radiating_lines(draw, high, rms)
 
         self.advance_frame()
-        return img
+        return frame
 
     def _draw_circles(self, draw: ImageDraw, low: float, mid: float, high: float, rms: float):
         """Draw concentric circles"""
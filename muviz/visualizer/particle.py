@@ -1,64 +1,132 @@
 """Particle system visualization"""
 
 import math
-import random
+from functools import lru_cache
+from typing import Dict, Tuple
+
 import numpy as np
 from PIL import Image, ImageDraw
 
-from muviz.visualizer.base import BaseVisualizer
+from muviz.profiling import profiler
+from muviz.visualizer.base import BaseVisualizer, Frame
+
+# Life lost by a particle per frame
+PARTICLE_DECAY = 0.02
+
+# Velocity kept per frame
+PARTICLE_DAMPING = 0.98
+
+# Per-particle arrays making up the visualizer state
+_STATE_ARRAYS = ("x", "y", "vx", "vy", "life", "size", "color", "alive")
+
+# Color lookup table rows of the low, mid and high particle colors
+_PALETTE_BANDS = np.arange(3)
 
 
-class Particle:
-    """Single particle"""
+@lru_cache(maxsize=None)
+def disc_offsets(radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the pixel offsets covered by a filled disc
 
-    def __init__(self, x: float, y: float, vx: float, vy: float, color: tuple, size: int):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.color = color
-        self.size = size
-        self.life = 1.0
+    The disc is rasterized once with PIL, so splatting it matches
+    ``ImageDraw.ellipse`` over ``[x - r, y - r, x + r, y + r]``.
+
+    Args:
+        radius: Disc radius in pixels
+
+    Returns:
+        Tuple of (dy, dx) offset arrays relative to the disc center
+    """
+    sprite = Image.new("L", (2 * radius + 1, 2 * radius + 1))
+    ImageDraw.Draw(sprite).ellipse([0, 0, 2 * radius, 2 * radius], fill=255)
+    dy, dx = np.nonzero(np.asarray(sprite))
+    return dy - radius, dx - radius
 
 
 class ParticleVisualizer(BaseVisualizer):
-    """Particle system that reacts to audio"""
+    """Particle system that reacts to audio
+
+    Particles are stored as a structure of arrays with one slot per
+    particle. Slots are filled round-robin, and since every particle
+    decays at the same rate the slot after the last spawned one always
+    holds the oldest particle, which is the one replaced when full.
+    """
+
+    # A particle lives 1 / PARTICLE_DECAY frames, so older frames never matter
+    warmup_frames = int(math.ceil(1 / PARTICLE_DECAY)) + 1
 
     def __init__(self, config):
         super().__init__(config)
-        self.particles = []
-        self.max_particles = 200
+        self.max_particles = config.max_particles
+        self._winner = None
+        self.reset()
 
-    def render_frame(self, audio_data: dict) -> Image.Image:
+    def render_frame(self, audio_data: dict) -> Frame:
         """Render particle visualization
 
         Args:
             audio_data: Dictionary with 'rms', 'frequency_bands', 'spectrum'
 
         Returns:
-            PIL Image
+            Frame array
         """
-        # Create background
-        img = Image.new("RGB", (self.config.width, self.config.height))
-        draw = ImageDraw.Draw(img)
+        # Start from the cached background
+        frame = self.new_frame()
 
-        # Fill background with slight trail effect
-        bg = self.theme["background"]
-        draw.rectangle([0, 0, self.config.width, self.config.height], fill=bg)
+        # Spawn new particles based on audio and move existing ones
+        self.update(audio_data)
+        with profiler.span("render.particles.draw"):
+            self._draw_particles(frame)
 
-        # Get audio features
+        self.advance_frame()
+        return frame
+
+    def update(self, audio_data: dict):
+        """Spawn and move particles for the current frame"""
         rms = audio_data.get("rms", 0.0)
         low, mid, high = audio_data.get("frequency_bands", (0.5, 0.5, 0.5))
 
-        # Spawn new particles based on audio
-        self._spawn_particles(rms, low, mid, high)
-
-        # Update and draw particles
-        self._update_particles()
-        self._draw_particles(draw)
-
-        self.advance_frame()
-        return img
+        with profiler.span("render.particles.update"):
+            self._spawn_particles(rms, low, mid, high)
+            self._update_particles()
+
+    def reset(self):
+        """Remove all particles"""
+        super().reset()
+        capacity = self.max_particles
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.next_slot = 0
+
+    def state_dict(self) -> Dict[str, np.ndarray]:
+        """Snapshot the particle arrays"""
+        state = super().state_dict()
+        for name in _STATE_ARRAYS:
+            state[name] = getattr(self, name).copy()
+        state["next_slot"] = np.array(self.next_slot)
+        return state
+
+    def load_state_dict(self, state: Dict[str, np.ndarray]):
+        """Restore the particle arrays"""
+        super().load_state_dict(state)
+        if len(state["alive"]) != self.max_particles:
+            raise ValueError(
+                f"Snapshot holds {len(state['alive'])} particle slots, "
+                f"expected {self.max_particles}"
+            )
+        for name in _STATE_ARRAYS:
+            getattr(self, name)[:] = state[name]
+        self.next_slot = int(state["next_slot"])
+
+    @property
+    def num_particles(self) -> int:
+        """Number of live particles"""
+        return int(np.count_nonzero(self.alive))
 
     def _spawn_particles(self, rms: float, low: float, mid: float, high: float):
         """Spawn new particles"""
@@ -68,63 +136,101 @@ class ParticleVisualizer(BaseVisualizer):
         center_x = self.config.width // 2
         center_y = self.config.height // 2
 
-        for _ in range(num_to_spawn):
-            if len(self.particles) >= self.max_particles:
-                break
+        # Seeded per frame so any frame range renders the same as a full run
+        rng = self.frame_rng()
+
+        # Choose color based on frequency
+        palette = self.get_colors(_PALETTE_BANDS, (low, mid, high))
+        band = np.searchsorted([0.33, 0.66], rng.random(num_to_spawn), side="right")
 
-            # Choose color based on frequency
-            rand = random.random()
-            if rand < 0.33:
-                color = self.get_color("low", low)
-            elif rand < 0.66:
-                color = self.get_color("mid", mid)
-            else:
-                color = self.get_color("high", high)
+        # Random velocity based on mid frequencies
+        speed = (mid + 0.2) * 5
+        angle = rng.random(num_to_spawn) * 2 * math.pi
 
-            # Random velocity based on mid frequencies
-            speed = (mid + 0.2) * 5
-            angle = random.random() * 2 * math.pi
-            vx = math.cos(angle) * speed
-            vy = math.sin(angle) * speed
+        size = rng.integers(2, 6 + int(rms * 6), endpoint=True, size=num_to_spawn)
 
-            size = random.randint(2, 6 + int(rms * 6))
+        # Spawn at center with some spread
+        spread = 50
+        x = center_x + rng.uniform(-spread, spread, num_to_spawn)
+        y = center_y + rng.uniform(-spread, spread, num_to_spawn)
 
-            # Spawn at center with some spread
-            spread = 50
-            x = center_x + random.uniform(-spread, spread)
-            y = center_y + random.uniform(-spread, spread)
+        # Over capacity the oldest particles make room for the new ones,
+        # which keeps the state a function of the last warmup_frames only
+        count = min(num_to_spawn, self.max_particles)
+        slots = (self.next_slot + np.arange(count)) % self.max_particles
+        spawned = slice(num_to_spawn - count, num_to_spawn)
+        self.next_slot = (self.next_slot + count) % self.max_particles
 
-            self.particles.append(Particle(x, y, vx, vy, color, size))
+        self.x[slots] = x[spawned]
+        self.y[slots] = y[spawned]
+        self.vx[slots] = np.cos(angle[spawned]) * speed
+        self.vy[slots] = np.sin(angle[spawned]) * speed
+        self.life[slots] = 1.0
+        self.size[slots] = size[spawned]
+        self.color[slots] = palette[band[spawned]]
+        self.alive[slots] = True
 
     def _update_particles(self):
         """Update particle positions"""
-        for p in self.particles:
-            p.x += p.vx
-            p.y += p.vy
-            p.life -= 0.02
+        self.x += self.vx
+        self.y += self.vy
+        self.life -= PARTICLE_DECAY
 
-            # Slow down
-            p.vx *= 0.98
-            p.vy *= 0.98
+        # Slow down
+        self.vx *= PARTICLE_DAMPING
+        self.vy *= PARTICLE_DAMPING
 
         # Remove dead particles
-        self.particles = [p for p in self.particles if p.life > 0]
-
-    def _draw_particles(self, draw: ImageDraw):
-        """Draw all particles"""
-        for p in self.particles:
-            if p.life > 0:
-                # Scale size by life
-                size = int(p.size * p.life)
-                if size < 1:
-                    size = 1
-
-                x = int(p.x)
-                y = int(p.y)
-
-                # Draw particle
-                color = tuple(int(c * p.life) for c in p.color)
-                draw.ellipse(
-                    [x - size, y - size, x + size, y + size],
-                    fill=color
-                )
+        self.alive &= self.life > 0
+
+    def _live_slots(self) -> np.ndarray:
+        """Get the slots of live particles, oldest first"""
+        order = (self.next_slot + np.arange(self.max_particles)) % self.max_particles
+        return order[self.alive[order]]
+
+    def _draw_particles(self, frame: np.ndarray):
+        """Draw all particles into the frame
+
+        Every particle is splatted as a pre-rasterized disc. Where discs
+        overlap the most recently spawned particle wins, as it would when
+        drawing them one by one in age order.
+        """
+        slots = self._live_slots()
+        if len(slots) == 0:
+            return
+        life = self.life[slots]
+
+        # Scale size by life
+        sizes = np.maximum((self.size[slots] * life).astype(np.int64), 1)
+        xs = self.x[slots].astype(np.int64)
+        ys = self.y[slots].astype(np.int64)
+        colors = (self.color[slots] * life[:, None]).astype(np.uint8)
+
+        height, width = frame.shape[:2]
+        pixels = []
+        owners = []
+        for radius in np.unique(sizes).tolist():
+            ranks = np.flatnonzero(sizes == radius)
+            dy, dx = disc_offsets(radius)
+            py = ys[ranks, None] + dy
+            px = xs[ranks, None] + dx
+            inside = (py >= 0) & (py < height) & (px >= 0) & (px < width)
+            pixels.append((py * width + px)[inside])
+            owners.append(np.broadcast_to(ranks[:, None], py.shape)[inside])
+
+        pixels = np.concatenate(pixels)
+        owners = np.concatenate(owners)
+
+        # Highest rank (newest particle) per covered pixel
+        winner = self._winner_buffer(height * width)
+        np.maximum.at(winner, pixels, owners)
+        frame.reshape(-1, frame.shape[2])[pixels, :3] = colors[winner[pixels]]
+
+        # Only touched pixels need clearing for the next frame
+        winner[pixels] = -1
+
+    def _winner_buffer(self, size: int) -> np.ndarray:
+        """Get the reusable per-pixel owner buffer, all set to -1"""
+        if self._winner is None or len(self._winner) != size:
+            self._winner = np.full(size, -1, dtype=np.int64)
+        return self._winner
@@ -12,7 +12,7 @@ setup(
     description="Audio visualization video generator",
     long_description=long_description,
     long_description_content_type="text/markdown",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     python_requires=">=3.8",
     install_requires=[
         "click>=8.0.0",
@@ -22,6 +22,7 @@ setup(
         "opencv-python>=4.8.0",
         "pillow>=10.0.0",
         "soundfile>=0.12.0",
+        "soxr>=0.3.2",
     ],
     entry_points={
         "console_scripts": [